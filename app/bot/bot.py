@@ -1,11 +1,14 @@
 import logging
+import socket
 
 import psycopg_pool
 
-from aiogram import Bot, Dispatcher
+from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.fsm.storage.base import BaseEventIsolation
+from aiogram.fsm.storage.memory import SimpleEventIsolation
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisEventIsolation
 
 from app.bot.handlers.admin import router as admin_router
 from app.bot.handlers.others import router as others_router
@@ -13,42 +16,117 @@ from app.bot.handlers.settings import router as settings_router
 from app.bot.handlers.user import router as user_router
 
 from app.bot.i18n.translator import get_translations
+from app.bot.keyboards.cache import KeyboardCache
+from app.bot.scheduler import ScheduledDispatcher, UpdateScheduler
+from app.bot.webhook import run_webhook
 
 from app.bot.middlewares.database import DataBaseMiddleware
+from app.bot.middlewares.fsm_context import CachedFSMContextMiddleware
 from app.bot.middlewares.i18n import TranslatorMiddleware
 from app.bot.middlewares.lang_settings import LangSettingsMiddleware
 from app.bot.middlewares.shadow_ban import ShadowBanMiddleware
 from app.bot.middlewares.statistics import ActivityCounterMiddleware
+from app.bot.middlewares.throttling import ThrottlingMiddleware
+from app.bot.middlewares.user_profile import UserProfileMiddleware
 
+from app.infrastructure.activity.buffer import ActivityBuffer
+from app.infrastructure.activity.leaderboard import Leaderboard
+from app.infrastructure.activity.redis_counter import RedisActivityCounter
+from app.infrastructure.cache.banned import BannedUsers
+from app.infrastructure.cache.profile import ProfileCache
+from app.infrastructure.cache.shared import SharedProfileCache
 from app.infrastructure.database.connection import get_pg_pool
+from app.infrastructure.database.monitoring import PoolMonitor
+from app.infrastructure.database.replica import ReplicaRouter
+from app.infrastructure.fsm.storage import CompactRedisStorage
+from app.infrastructure.fsm.tiered import TieredStorage
+from app.infrastructure.telegram.broadcast import Broadcaster
+from app.infrastructure.telegram.menu import ChatMenus
+from app.infrastructure.telegram.outbound import OutboundRateLimiter
+from app.infrastructure.throttling.buckets import MemoryTokenBuckets, RedisTokenBuckets
 
 from config import Config
-from redis.asyncio import Redis
+from redis.asyncio import BlockingConnectionPool, Redis
 
 logger = logging.getLogger(__name__)
 
 
-async def main(config: Config) -> None:
-    """Initialize the bot and start the bot."""
+async def main(
+    config: Config,
+    sock: socket.socket | None = None,
+    worker_index: int = 0,
+) -> None:
+    """
+    Initialize the bot and start the bot. In webhook mode `sock` is the
+    listening socket shared by the worker processes.
+    """
 
     logger.info("Starting bot...")
+    workers = config.webhook.workers if config.webhook.enabled else 1
 
-    storage = RedisStorage(
-        redis=Redis(
+    # One connection pool shared by FSM storage, caches and counters
+    redis = Redis(
+        connection_pool=BlockingConnectionPool(
             host=config.redis.host,
             port=config.redis.port,
             db=config.redis.db,
             password=config.redis.password,
             username=config.redis.username,
+            max_connections=config.redis.max_connections,
+            timeout=config.redis.pool_timeout
         )
     )
+    storage: CompactRedisStorage | TieredStorage = CompactRedisStorage(
+        redis=redis,
+        key_builder=DefaultKeyBuilder(prefix=config.fsm.key_prefix),
+        state_ttl=config.fsm.state_ttl,
+        data_ttl=config.fsm.data_ttl,
+        serializer=config.fsm.serializer
+    )
+    # Keep FSM of active users in memory, it is written to Redis behind
+    # and on shutdown, when the dispatcher closes the storage
+    if config.fsm.memory_tier:
+        storage = TieredStorage(
+            backend=storage,
+            max_size=config.fsm.memory_max_size,
+            flush_interval=config.fsm.memory_flush_interval
+        )
+        await storage.start()
 
     #Initialize the bot
     bot = Bot(
         token=config.bot.token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    dp = Dispatcher(storage=storage)
+
+    # Queue outgoing requests to stay under Telegram flood limits
+    outbound_limiter = OutboundRateLimiter(
+        # Every worker process sends its share of the global budget
+        global_rate=config.outbound.global_rate / workers,
+        per_chat_rate=config.outbound.per_chat_rate,
+        max_retries=config.outbound.max_retries,
+        admin_ids=config.bot.admin_ids
+    )
+    bot.session.middleware(outbound_limiter)
+    await outbound_limiter.start()
+
+    # Handle updates of different chats concurrently, of one chat in order
+    # Lock FSM of a chat for the whole update, so that changes kept in
+    # memory until the end of the update are not lost by a concurrent one
+    events_isolation: BaseEventIsolation
+    if workers > 1:
+        events_isolation = RedisEventIsolation(
+            redis=redis,
+            key_builder=DefaultKeyBuilder(prefix=config.fsm.key_prefix)
+        )
+    else:
+        events_isolation = SimpleEventIsolation()
+
+    dp = ScheduledDispatcher(
+        storage=storage,
+        events_isolation=events_isolation,
+        scheduler=UpdateScheduler(max_concurrency=config.scheduler.max_concurrency)
+    )
 
     # Create connection pool with Postgres
     db_pool: psycopg_pool.AsyncConnectionPool = await get_pg_pool(
@@ -56,8 +134,96 @@ async def main(config: Config) -> None:
         host=config.db.host,
         port=config.db.port,
         user=config.db.user,
-        password=config.db.password
+        password=config.db.password,
+        min_size=config.db.pool_min_size,
+        max_size=config.db.pool_max_size,
+        timeout=config.db.pool_timeout,
+        max_waiting=config.db.pool_max_waiting,
+        max_lifetime=config.db.pool_max_lifetime,
+        max_idle=config.db.pool_max_idle,
+        reconnect_timeout=config.db.pool_reconnect_timeout,
+        prepare_threshold=config.db.prepare_threshold
+    )
+
+    # Create connection pool with the read replica, if there is one
+    db_replica: ReplicaRouter | None = None
+    if config.db.replica_host:
+        try:
+            replica_pool = await get_pg_pool(
+                db_name=config.db.name,
+                host=config.db.replica_host,
+                port=config.db.replica_port or config.db.port,
+                user=config.db.user,
+                password=config.db.password,
+                min_size=config.db.pool_min_size,
+                max_size=config.db.pool_max_size,
+                timeout=config.db.pool_timeout,
+                max_lifetime=config.db.pool_max_lifetime,
+                max_idle=config.db.pool_max_idle,
+                reconnect_timeout=config.db.pool_reconnect_timeout,
+                prepare_threshold=config.db.prepare_threshold,
+                autocommit=True
+            )
+        except Exception as e:
+            logger.error('Read replica is unavailable, using primary only: %s', e)
+        else:
+            db_replica = ReplicaRouter(
+                pool=replica_pool,
+                max_lag=config.db.replica_max_lag,
+                check_interval=config.db.replica_check_interval
+            )
+            await db_replica.start()
+
+    # Export pool statistics and resize the pool if adaptive mode is on
+    pool_monitor = PoolMonitor(
+        pool=db_pool,
+        interval=config.db.pool_stats_interval,
+        adaptive=config.db.pool_adaptive,
+        adaptive_max_size=config.db.pool_adaptive_max_size
     )
+    await pool_monitor.start()
+
+    # Create cache of user profiles shared between bot instances
+    profile_cache = SharedProfileCache(
+        redis=redis,
+        local=ProfileCache(
+            max_size=config.cache.profile_max_size,
+            ttl=config.cache.profile_ttl
+        ),
+        ttl=config.cache.profile_redis_ttl
+    )
+    await profile_cache.start()
+
+    # Load banned users to check shadow bans without the database
+    banned_users = BannedUsers(redis=redis, db_pool=db_pool)
+    await banned_users.start()
+
+    # Create write-behind counter of user activity
+    activity_buffer: ActivityBuffer | RedisActivityCounter
+    if config.activity.backend == 'redis':
+        activity_buffer = RedisActivityCounter(
+            redis=redis,
+            db_pool=db_pool,
+            drain_interval=config.activity.flush_interval
+        )
+    else:
+        activity_buffer = ActivityBuffer(
+            db_pool=db_pool,
+            flush_interval=config.activity.flush_interval,
+            max_pending=config.activity.max_pending
+        )
+    await activity_buffer.start()
+
+    # Create leaderboard of user activity in Redis if enabled
+    leaderboard: Leaderboard | None = None
+    if config.activity.leaderboard:
+        leaderboard = Leaderboard(
+            redis=redis,
+            db_pool=db_pool,
+            reconcile_interval=config.activity.leaderboard_reconcile_interval,
+            activity=activity_buffer
+        )
+        await leaderboard.start()
 
     # Get translations dictionary
     translations = get_translations()
@@ -65,6 +231,22 @@ async def main(config: Config) -> None:
     # Create locales list from translations dictionary
     locales = list(translations.keys())
 
+    # Build all the keyboard and menu variants once
+    keyboards = KeyboardCache.build(translations)
+
+    # Create broadcaster and resume an unfinished broadcast
+    broadcaster = Broadcaster(
+        bot=bot,
+        redis=redis,
+        db_pool=db_pool,
+        profile_cache=profile_cache,
+        translations=translations,
+        workers=config.broadcast.workers,
+        rate=config.broadcast.rate,
+        batch_size=config.broadcast.batch_size
+    )
+    await broadcaster.start()
+
     logger.info('Including routers...')
     dp.include_routers(
         settings_router,
@@ -74,22 +256,70 @@ async def main(config: Config) -> None:
     )
 
     logger.info('Including middlewares...')
-    dp.update.middleware(DataBaseMiddleware())
+    if config.throttling.enabled:
+        limiter: MemoryTokenBuckets | RedisTokenBuckets
+        if config.throttling.backend == 'redis':
+            limiter = RedisTokenBuckets(redis=redis, rates=config.throttling.rates)
+        else:
+            limiter = MemoryTokenBuckets(rates=config.throttling.rates)
+        dp.update.middleware(
+            ThrottlingMiddleware(limiter=limiter, warn=config.throttling.warn)
+        )
     dp.update.middleware(ShadowBanMiddleware())
+    dp.update.middleware(DataBaseMiddleware())
+    dp.update.middleware(UserProfileMiddleware())
     dp.update.middleware(ActivityCounterMiddleware())
+    dp.update.middleware(CachedFSMContextMiddleware())
     dp.update.middleware(LangSettingsMiddleware())
     dp.update.middleware(TranslatorMiddleware())
 
-    # Run polling
+    workflow_data = dict(
+        db_pool=db_pool,
+        db_replica=db_replica,
+        profile_cache=profile_cache,
+        banned_users=banned_users,
+        activity_buffer=activity_buffer,
+        leaderboard=leaderboard,
+        broadcaster=broadcaster,
+        chat_menus=ChatMenus(redis=redis),
+        translations=translations,
+        locales=locales,
+        keyboards=keyboards,
+        admin_ids=config.bot.admin_ids
+    )
+
+    # Run webhook server or polling
     try:
-        await dp.start_polling(
-            bot, db_pool=db_pool,
-            translations=translations,
-            locales=locales,
-            admin_ids=config.bot.admin_ids
-        )
+        if config.webhook.enabled:
+            await run_webhook(
+                bot, dp, config.webhook,
+                sock=sock,
+                set_webhook=worker_index == 0,
+                max_pending=config.scheduler.max_pending,
+                **workflow_data
+            )
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(
+                bot,
+                tasks_concurrency_limit=config.scheduler.max_pending,
+                **workflow_data
+            )
     except Exception as e:
         logger.exception(e)
     finally:
+        await broadcaster.stop()
+        await outbound_limiter.stop()
+        outbound_limiter.log_stats()
+        if leaderboard is not None:
+            await leaderboard.stop()
+        await activity_buffer.stop()
+        await banned_users.stop()
+        await profile_cache.stop()
+        profile_cache.log_stats()
+        await pool_monitor.stop()
+        pool_monitor.report()
+        if db_replica is not None:
+            await db_replica.stop()
         await db_pool.close()
         logger.info('Connection to Postgres closed')
@@ -1,9 +1,8 @@
 from aiogram.filters import BaseFilter
 from aiogram.types import CallbackQuery, Message
-from psycopg import AsyncConnection
 
 from app.bot.enums.roles import UserRole
-from app.infrastructure.database.db import get_user_role
+from app.infrastructure.database.models import UserProfile
 
 
 class LocaleFilter(BaseFilter):
@@ -31,14 +30,9 @@ class UserRoleFilter(BaseFilter):
     async def __call__(
             self,
             event: Message | CallbackQuery,
-            conn: AsyncConnection
+            user_profile: UserProfile | None
     ) -> bool:
-        user = event.from_user
-        if not user:
+        if not event.from_user or user_profile is None:
             return False
 
-        role = await get_user_role(conn, user_id=user.id)
-        if role is None:
-            return False
-
-        return role in self.roles
+        return user_profile.role in self.roles
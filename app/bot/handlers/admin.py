@@ -1,21 +1,27 @@
 import logging
+import re
 
-from aiogram import Router
+from aiogram import Bot, Router
 from aiogram.filters import Command, CommandObject
 from aiogram.types import Message
 from app.bot.enums.roles import UserRole
 from app.bot.filters import UserRoleFilter
+from app.infrastructure.activity.leaderboard import Leaderboard
+from app.infrastructure.cache.banned import BannedUsers
+from app.infrastructure.cache.shared import SharedProfileCache
+from app.infrastructure.database.connection import LazyConnection
 from app.infrastructure.database.db import (
-    change_user_banned_status_by_id,
-    change_user_banned_status_by_username,
     get_statistics,
-    get_user_banned_status_by_id,
-    get_user_banned_status_by_username,
+    set_banned_from_list,
+    switch_user_banned_status,
 )
-from psycopg import AsyncConnection
+from app.infrastructure.database.models import UserProfile
+from app.infrastructure.telegram.broadcast import Broadcaster
 
 logger = logging.getLogger(__name__)
 
+MAX_USER_LIST_SIZE = 20 * 1024 * 1024  # Bot API download limit
+
 router = Router()
 
 router.message.filter(UserRoleFilter(UserRole.ADMIN))
@@ -33,12 +39,16 @@ async def process_admin_help_command(message: Message, i18n: dict):
 @router.message(Command('statistics'))
 async def process_admin_statistics_command(
         message: Message,
-        conn: AsyncConnection,
-        i18n: dict[str, str]
+        conn: LazyConnection,
+        i18n: dict[str, str],
+        leaderboard: Leaderboard | None
 ):
     """Handles `/statistics` command for users with role `ADMIN`"""
 
-    statistics = await get_statistics(conn)
+    if leaderboard is not None:
+        statistics = await leaderboard.top(5)
+    else:
+        statistics = await get_statistics(conn) or []
     await message.answer(
         text=i18n.get('statistics').format(
             '\n'.join(
@@ -53,8 +63,10 @@ async def process_admin_statistics_command(
 async def process_ban_command(
     message: Message,
     command: CommandObject,
-    conn: AsyncConnection,
-    i18n: dict[str, str]
+    conn: LazyConnection,
+    i18n: dict[str, str],
+    profile_cache: SharedProfileCache,
+    banned_users: BannedUsers
 ) -> None:
     """Handles `/ban` command for users with role `ADMIN`"""
 
@@ -67,36 +79,29 @@ async def process_ban_command(
     arg_user = args.split()[0].strip()
 
     if arg_user.isdigit():
-        banned_status = await get_user_banned_status_by_id(
+        banned_status, user_ids = await switch_user_banned_status(
             conn,
+            banned=True,
             user_id=int(arg_user)
         )
     elif arg_user.startswith('@'):
-        banned_status = await get_user_banned_status_by_username(
+        banned_status, user_ids = await switch_user_banned_status(
             conn,
+            banned=True,
             username=arg_user[1:]
         )
     else:
         await message.reply(text=i18n.get('incorrect_ban_arg'))
         return
 
+    await profile_cache.invalidate(*user_ids)
+    await banned_users.add(*user_ids)
+
     if banned_status is None:
         await message.reply(text=i18n.get('no_user'))
     elif banned_status:
         await message.reply(text=i18n.get('already_banned'))
     else:
-        if arg_user.isdigit():
-            await change_user_banned_status_by_id(
-                conn,
-                banned=True,
-                user_id=int(arg_user)
-            )
-        else:
-            await change_user_banned_status_by_username(
-                conn,
-                banned=True,
-                username=arg_user[1:]
-            )
         await message.reply(text=i18n.get('successfully_banned'))
 
 
@@ -104,8 +109,10 @@ async def process_ban_command(
 async def process_unban_command(
     message: Message,
     command: CommandObject,
-    conn: AsyncConnection,
-    i18n: dict[str, str]
+    conn: LazyConnection,
+    i18n: dict[str, str],
+    profile_cache: SharedProfileCache,
+    banned_users: BannedUsers
 ) -> None:
     """Handles `/unban` command for users with role `ADMIN`"""
 
@@ -118,34 +125,155 @@ async def process_unban_command(
     arg_user = args.split()[0].strip()
 
     if arg_user.isdigit():
-        banned_status = await get_user_banned_status_by_id(
+        banned_status, user_ids = await switch_user_banned_status(
             conn,
+            banned=False,
             user_id=int(arg_user)
         )
     elif arg_user.startswith('@'):
-        banned_status = await get_user_banned_status_by_username(
+        banned_status, user_ids = await switch_user_banned_status(
             conn,
+            banned=False,
             username=arg_user[1:]
         )
     else:
         await message.reply(text=i18n.get('incorrect_unban_arg'))
         return
 
+    await profile_cache.invalidate(*user_ids)
+    await banned_users.discard(*user_ids)
+
     if banned_status is None:
         await message.reply(text=i18n.get('no_user'))
     elif banned_status:
-        if arg_user.isdigit():
-            await change_user_banned_status_by_id(
-                conn,
-                banned=False,
-                user_id=int(arg_user)
+        await message.reply(text=i18n.get('successfully_unbanned'))
+    else:
+        await message.reply(text=i18n.get('not_banned'))
+
+
+def parse_user_list(text: str) -> tuple[list[int], list[str], int]:
+    """
+    Split a list of user ids and @usernames separated by new lines, commas,
+    semicolons or spaces. Return unique ids, unique usernames and the number
+    of invalid entries.
+    """
+
+    user_ids: dict[int, None] = {}
+    usernames: dict[str, None] = {}
+    invalid = 0
+
+    for entry in re.split(r'[\s,;]+', text):
+        entry = entry.strip('"\'')
+        if not entry:
+            continue
+        if entry.isdigit():
+            user_ids[int(entry)] = None
+        elif entry.startswith('@') and len(entry) > 1:
+            usernames[entry[1:]] = None
+        else:
+            invalid += 1
+
+    return list(user_ids), list(usernames), invalid
+
+
+@router.message(Command('massban', 'massunban'))
+async def process_mass_ban_command(
+    message: Message,
+    command: CommandObject,
+    bot: Bot,
+    conn: LazyConnection,
+    i18n: dict[str, str],
+    profile_cache: SharedProfileCache,
+    banned_users: BannedUsers
+) -> None:
+    """
+    Handles `/massban` and `/massunban` commands sent as a caption to
+    a document with user ids and @usernames, for users with role `ADMIN`
+    """
+
+    banned = command.command == 'massban'
+    document = message.document
+
+    if document is None:
+        await message.reply(text=i18n.get('empty_mass_ban_answer'))
+        return
+
+    if document.file_size and document.file_size > MAX_USER_LIST_SIZE:
+        await message.reply(text=i18n.get('too_large_mass_ban_file'))
+        return
+
+    file = await bot.download(document)
+    user_ids, usernames, invalid = parse_user_list(
+        file.read().decode('utf-8', errors='replace')
+    )
+
+    if not user_ids and not usernames:
+        await message.reply(text=i18n.get('empty_mass_ban_answer'))
+        return
+
+    found, updated = await set_banned_from_list(
+        conn,
+        banned=banned,
+        user_ids=user_ids,
+        usernames=usernames
+    )
+    await profile_cache.invalidate(*updated)
+    if banned:
+        await banned_users.add(*updated)
+    else:
+        await banned_users.discard(*updated)
+
+    await message.reply(
+        text=i18n.get('mass_ban_result' if banned else 'mass_unban_result').format(
+            len(user_ids) + len(usernames), found, len(updated), invalid
+        )
+    )
+
+
+@router.message(Command('broadcast'))
+async def process_broadcast_command(
+    message: Message,
+    command: CommandObject,
+    i18n: dict[str, str],
+    broadcaster: Broadcaster,
+    user_profile: UserProfile | None
+) -> None:
+    """
+    Handles `/broadcast` command for users with role `ADMIN`: sent as a reply
+    starts a broadcast of the replied message, with the `cancel` argument
+    cancels the current broadcast, otherwise shows its progress
+    """
+
+    if command.args and command.args.strip() == 'cancel':
+        state = await broadcaster.cancel()
+        if state is None:
+            await message.reply(text=i18n.get('no_broadcast'))
+        else:
+            await message.reply(
+                text=i18n.get('broadcast_cancelled').format(
+                    state.sent, state.blocked, state.failed
+                )
             )
+        return
+
+    if message.reply_to_message is None:
+        state = await broadcaster.status()
+        if state is None:
+            await message.reply(text=i18n.get('no_broadcast'))
         else:
-            await change_user_banned_status_by_username(
-                conn,
-                banned=False,
-                username=arg_user[1:]
+            await message.reply(
+                text=i18n.get('broadcast_status').format(
+                    state.sent, state.blocked, state.failed
+                )
             )
-        await message.reply(text=i18n.get('successfully_unbanned'))
+        return
 
-    await message.reply(text=i18n.get('not_banned'))
+    started = await broadcaster.begin(
+        admin_id=message.chat.id,
+        from_chat_id=message.chat.id,
+        message_id=message.reply_to_message.message_id,
+        language=user_profile.language if user_profile else None
+    )
+    await message.reply(
+        text=i18n.get('broadcast_started' if started else 'broadcast_in_progress')
+    )
@@ -1,12 +1,12 @@
 from aiogram import Router
 from aiogram.types import Message
-from psycopg import AsyncConnection
+from app.infrastructure.database.connection import LazyConnection
 
 router = Router()
 
 
 @router.message()
-async def send_echo(message: Message, conn: AsyncConnection, i18n: dict):
+async def send_echo(message: Message, conn: LazyConnection, i18n: dict):
     """Handles all the updates not caught by other handlers"""
 
     try:
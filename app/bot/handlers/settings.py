@@ -7,23 +7,20 @@ import logging
 from contextlib import suppress
 
 from aiogram import Bot, F, Router
-from aiogram.enums import BotCommandScopeType
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.types import BotCommandScopeChat, CallbackQuery, Message
+from aiogram.types import CallbackQuery, Message
 
+from app.bot.enums.roles import UserRole
 from app.bot.filters import LocaleFilter
-from app.bot.keyboards.keyboards import get_lang_settings_kb
-from app.bot.keyboards.menu_button import get_main_menu_commands
+from app.bot.keyboards.cache import KeyboardCache
 from app.bot.states import LangSG
-from app.infrastructure.database.db import (
-    get_user_lang,
-    get_user_role,
-    update_user_lang,
-)
-
-from psycopg import AsyncConnection
+from app.infrastructure.cache.shared import SharedProfileCache
+from app.infrastructure.database.connection import LazyConnection
+from app.infrastructure.database.db import update_user_lang
+from app.infrastructure.database.models import UserProfile
+from app.infrastructure.telegram.menu import ChatMenus
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +32,9 @@ async def process_any_message_when_lang(
     message: Message,
     bot: Bot,
     i18n: dict[str, str],
+    lang: str,
     state: FSMContext,
-    locales: list[str],
+    keyboards: KeyboardCache,
 ):
     """Works with any message except command `/start` in lang choice state."""
 
@@ -51,7 +49,7 @@ async def process_any_message_when_lang(
 
     msg = await message.answer(
         text=i18n.get("/lang"),
-        reply_markup=get_lang_settings_kb(i18n=i18n, locales=locales, checked=user_lang),
+        reply_markup=keyboards.lang_settings_kb(lang, user_lang),
     )
 
     await state.update_data(lang_settings_msg_id=msg.message_id)
@@ -60,21 +58,20 @@ async def process_any_message_when_lang(
 @router.message(Command(commands=['lang']))
 async def process_lang_command(
     message: Message,
-    conn: AsyncConnection,
     i18n: dict[str, str],
+    lang: str,
     state: FSMContext,
-    locales: list[str],
+    keyboards: KeyboardCache,
+    user_profile: UserProfile | None,
 ):
     """Handles command `/lang`."""
 
     await state.set_state(LangSG.lang)
-    user_lang = await get_user_lang(conn, user_id=message.from_user.id)
+    user_lang = user_profile.language if user_profile else None
 
     msg = await message.answer(
         text=i18n.get("/lang"),
-        reply_markup=get_lang_settings_kb(
-            i18n=i18n, locales=locales, checked=user_lang
-        )
+        reply_markup=keyboards.lang_settings_kb(lang, user_lang)
     )
 
     await state.update_data(
@@ -87,9 +84,14 @@ async def process_lang_command(
 async def process_save_click(
         callback: CallbackQuery,
         bot: Bot,
-        conn: AsyncConnection,
+        conn: LazyConnection,
         i18n: dict[str, str],
-        state: FSMContext
+        lang: str,
+        state: FSMContext,
+        user_profile: UserProfile | None,
+        profile_cache: SharedProfileCache,
+        chat_menus: ChatMenus,
+        keyboards: KeyboardCache
 ):
     """Handles pressing `Save` button in lang choice state."""
 
@@ -99,15 +101,14 @@ async def process_save_click(
         language=data.get('user_lang'),
         user_id=callback.from_user.id
     )
+    await profile_cache.update(callback.from_user.id, language=data.get('user_lang'))
     await callback.message.edit_text(text=i18n.get('lang_saved'))
 
-    user_role = await get_user_role(conn, user_id=callback.from_user.id)
-    await bot.set_my_commands(
-        commands=get_main_menu_commands(i18n=i18n, role=user_role),
-        scope=BotCommandScopeChat(
-            type=BotCommandScopeType.CHAT,
-            chat_id=callback.from_user.id
-        )
+    user_role = user_profile.role if user_profile else UserRole.USER
+    await chat_menus.set_commands(
+        bot,
+        chat_id=callback.from_user.id,
+        commands=keyboards.main_menu_commands(lang, user_role)
     )
     await state.update_data(lang_settings_msg_id=None, user_lang=None)
     await state.set_state()
@@ -116,13 +117,13 @@ async def process_save_click(
 @router.callback_query(F.data=='cancel_lang_button_data')
 async def process_cancel_click(
         callback: CallbackQuery,
-        conn: AsyncConnection,
         i18n: dict[str, str],
-        state: FSMContext
+        state: FSMContext,
+        user_profile: UserProfile | None
 ):
     """Handles pressing `Cancel` button in lang choice state."""
 
-    user_lang = await get_user_lang(conn, user_id=callback.from_user.id)
+    user_lang = user_profile.language if user_profile else None
     await callback.message.edit_text(
         text=i18n.get('lang_cancelled').format(i18n.get(user_lang))
     )
@@ -134,16 +135,15 @@ async def process_cancel_click(
 async def process_lang_click(
         callback: CallbackQuery,
         i18n: dict[str, str],
-        locales: list[str]
+        lang: str,
+        keyboards: KeyboardCache
 ):
     """Handles language button click in lang choice state."""
 
     try:
         await callback.message.edit_text(
             text=i18n.get("/lang"),
-            reply_markup=get_lang_settings_kb(
-                i18n=i18n, locales=locales, checked=callback.data
-            ),
+            reply_markup=keyboards.lang_settings_kb(lang, callback.data),
         )
     except TelegramBadRequest:
         await callback.answer()
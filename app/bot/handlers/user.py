@@ -2,21 +2,21 @@ import logging
 from contextlib import suppress
 
 from aiogram import Bot, Router
-from aiogram.enums import BotCommandScopeType
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import KICKED, ChatMemberUpdatedFilter, Command, CommandStart
 from aiogram.fsm.context import FSMContext
-from aiogram.types import BotCommandScopeChat, ChatMemberUpdated, Message
+from aiogram.types import ChatMemberUpdated, Message
 from app.bot.enums.roles import UserRole
-from app.bot.keyboards.menu_button import get_main_menu_commands
+from app.bot.keyboards.cache import KeyboardCache
 from app.bot.states.states import LangSG
+from app.infrastructure.cache.shared import SharedProfileCache
+from app.infrastructure.database.connection import LazyConnection
 from app.infrastructure.database.db import (
-    add_user,
     change_user_alive_status,
-    get_user,
-    get_user_lang,
+    upsert_user_on_start,
 )
-from psycopg.connection_async import AsyncConnection
+from app.infrastructure.database.models import UserProfile
+from app.infrastructure.telegram.menu import ChatMenus
 
 logger = logging.getLogger(__name__)
 
@@ -26,36 +26,35 @@ router = Router()
 @router.message(CommandStart())
 async def process_start_command(
     message: Message,
-    conn: AsyncConnection,
+    conn: LazyConnection,
     bot: Bot,
     i18n: dict[str, str],
+    lang: str,
     state: FSMContext,
     admin_ids: list[int],
-    translations: dict
+    translations: dict,
+    user_profile: UserProfile | None,
+    profile_cache: SharedProfileCache,
+    chat_menus: ChatMenus,
+    keyboards: KeyboardCache
 ):
     """Handles `start` command"""
 
-    user_row = await get_user(conn, user_id=message.from_user.id)
-    if user_row is None:
-        if message.from_user.id in admin_ids:
-            user_role = UserRole.ADMIN
-        else:
-            user_role = UserRole.USER
-
-        await add_user(
-            conn,
-            user_id=message.from_user.id,
-            username=message.from_user.username,
-            language=message.from_user.language_code,
-            role=user_role
-        )
+    if message.from_user.id in admin_ids:
+        new_user_role = UserRole.ADMIN
     else:
-        user_role = UserRole(user_row[4])
-        await change_user_alive_status(
-            conn,
-            is_alive=True,
-            user_id=message.from_user.id
-        )
+        new_user_role = UserRole.USER
+
+    started_profile = await upsert_user_on_start(
+        conn,
+        user_id=message.from_user.id,
+        username=message.from_user.username,
+        language=message.from_user.language_code or translations['default'],
+        role=new_user_role
+    )
+    if started_profile != user_profile:
+        await profile_cache.invalidate(message.from_user.id)
+    user_role = started_profile.role
 
     if await state.get_state() == LangSG.lang:
         data = await state.get_data()
@@ -66,15 +65,14 @@ async def process_start_command(
                     chat_id=message.from_user.id,
                     message_id=msg_id
                 )
-        user_lang = await get_user_lang(conn, user_id=message.from_user.id)
-        i18n = translations.get(user_lang)
-
-    await bot.set_my_commands(
-        commands=get_main_menu_commands(i18n=i18n, role=user_role),
-        scope=BotCommandScopeChat(
-            type=BotCommandScopeType.CHAT,
-            chat_id=message.from_user.id
-        )
+        if started_profile.language in translations:
+            lang = started_profile.language
+            i18n = translations[lang]
+
+    await chat_menus.set_commands(
+        bot,
+        chat_id=message.from_user.id,
+        commands=keyboards.main_menu_commands(lang, user_role)
     )
 
     await message.answer(text=i18n.get("/start"))
@@ -91,7 +89,8 @@ async def process_help_command(message: Message, i18n: dict[str, str]):
 @router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=KICKED))
 async def process_user_blocked_bot(
         event: ChatMemberUpdated,
-        conn: AsyncConnection
+        conn: LazyConnection,
+        profile_cache: SharedProfileCache
 ):
     """Handles blocking the bot by user"""
 
@@ -101,3 +100,4 @@ async def process_user_blocked_bot(
         is_alive=False,
         user_id=event.from_user.id
     )
+    await profile_cache.update(event.from_user.id, is_alive=False)
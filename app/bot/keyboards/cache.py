@@ -0,0 +1,65 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from aiogram.types import BotCommand, InlineKeyboardMarkup
+
+from app.bot.enums.roles import UserRole
+from app.bot.keyboards.keyboards import get_lang_settings_kb
+from app.bot.keyboards.menu_button import get_main_menu_commands
+
+
+@dataclass(frozen=True)
+class KeyboardCache:
+    """
+    All the variants of the language settings keyboard and of the main menu
+    commands, built once at startup. Keyboards are keyed by the interface
+    language and the checked locale, menus by the language and the role.
+    """
+
+    default: str
+    lang_settings: Mapping[tuple[str, str | None], InlineKeyboardMarkup]
+    main_menu: Mapping[tuple[str, UserRole], tuple[BotCommand, ...]]
+
+    @classmethod
+    def build(cls, translations: dict) -> 'KeyboardCache':
+        languages = [
+            lang for lang, i18n in translations.items() if isinstance(i18n, dict)
+        ]
+
+        lang_settings = {
+            (lang, checked): get_lang_settings_kb(
+                i18n=translations[lang], locales=languages, checked=checked
+            )
+            for lang in languages
+            for checked in [*languages, None]
+        }
+        main_menu = {
+            (lang, role): tuple(
+                get_main_menu_commands(i18n=translations[lang], role=role)
+            )
+            for lang in languages
+            for role in UserRole
+        }
+
+        return cls(
+            default=translations['default'],
+            lang_settings=MappingProxyType(lang_settings),
+            main_menu=MappingProxyType(main_menu),
+        )
+
+    def _language(self, lang: str) -> str:
+        return lang if (lang, UserRole.USER) in self.main_menu else self.default
+
+    def lang_settings_kb(self, lang: str, checked: str | None) -> InlineKeyboardMarkup:
+        """Keyboard to set language settings in the given interface language."""
+
+        lang = self._language(lang)
+        return self.lang_settings.get(
+            (lang, checked), self.lang_settings[(lang, None)]
+        )
+
+    def main_menu_commands(self, lang: str, role: UserRole) -> tuple[BotCommand, ...]:
+        """Main menu commands for the role in the given interface language."""
+
+        return self.main_menu[(self._language(lang), role)]
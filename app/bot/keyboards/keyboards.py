@@ -4,7 +4,7 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 def get_lang_settings_kb(
         i18n: dict,
         locales: list[str],
-        checked: str
+        checked: str | None
 ) -> InlineKeyboardMarkup:
     """Keyboard to set language settings."""
 
@@ -28,6 +28,18 @@ def get_main_menu_commands(i18n: dict[str, str], role: UserRole):
                 command='/unban',
                 description=i18n.get('/unban_description')
             ),
+            BotCommand(
+                command='/massban',
+                description=i18n.get('/massban_description')
+            ),
+            BotCommand(
+                command='/massunban',
+                description=i18n.get('/massunban_description')
+            ),
+            BotCommand(
+                command='/broadcast',
+                description=i18n.get('/broadcast_description')
+            ),
             BotCommand(
                 command='/statistics',
                 description=i18n.get('/statistics_description')
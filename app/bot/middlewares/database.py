@@ -7,11 +7,13 @@ from aiogram import BaseMiddleware
 from aiogram.types import Update
 from psycopg_pool import AsyncConnectionPool
 
+from app.infrastructure.database.connection import LazyConnection
+
 logger = logging.getLogger(__name__)
 
 
 class DataBaseMiddleware(BaseMiddleware):
-    """Extract and pass connection."""
+    """Pass a lazy connection to the pool."""
 
     async def __call__(
         self,
@@ -20,9 +22,10 @@ class DataBaseMiddleware(BaseMiddleware):
         data: dict[str, Any],
     ) -> Any:
         """
-        Extract pool of connections from `workflow_data`, get one
-        connection from this pool, open a transaction and put the connection
-        to `workflow_data`.
+        Extract pool of connections from `workflow_data` and put to
+        `workflow_data` a lazy connection, which takes a real connection
+        from the pool only while a query runs. Slow Telegram API calls
+        in handlers do not hold pool connections.
         """
 
         db_pool: AsyncConnectionPool = data.get('db_pool')
@@ -30,14 +33,9 @@ class DataBaseMiddleware(BaseMiddleware):
             logger.error('Database pool is not provided in middleware data.')
             raise RuntimeError('Missing db_pool in middleware context.')
 
-        async with db_pool.connection() as connection:
-            try:
-                data['conn'] = connection
-                result = await handler(event, data)
-            except Exception as e:
-                logger.error('Transaction rolled back due to error: %s', e)
-                raise
-
-        # Some code for the case the transaction was completed successfully.
-
-        return result
+        data['conn'] = LazyConnection(db_pool, replica=data.get('db_replica'))
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            logger.error('Update handling failed due to error: %s', e)
+            raise
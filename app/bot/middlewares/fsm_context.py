@@ -0,0 +1,96 @@
+from collections.abc import Awaitable, Callable, Mapping
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType
+from aiogram.types import TelegramObject
+
+_NOT_LOADED: Any = object()
+
+
+class CachedFSMContext(FSMContext):
+    """
+    FSM context that reads the state and the data from the storage at most
+    once per update and keeps changes in memory until `flush` is called.
+    """
+
+    def __init__(self, context: FSMContext, raw_state: str | None = _NOT_LOADED) -> None:
+        super().__init__(storage=context.storage, key=context.key)
+        self._state: str | None = raw_state
+        self._data: dict[str, Any] = _NOT_LOADED
+        self._state_changed = False
+        self._data_changed = False
+
+    async def get_state(self) -> str | None:
+        if self._state is _NOT_LOADED:
+            self._state = await super().get_state()
+        return self._state
+
+    async def set_state(self, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        if self._state is _NOT_LOADED or state != self._state:
+            self._state = state
+            self._state_changed = True
+
+    async def _load_data(self) -> dict[str, Any]:
+        if self._data is _NOT_LOADED:
+            self._data = await super().get_data()
+        return self._data
+
+    async def get_data(self) -> dict[str, Any]:
+        return (await self._load_data()).copy()
+
+    async def get_value(self, key: str, default: Any | None = None) -> Any | None:
+        return (await self._load_data()).get(key, default)
+
+    async def set_data(self, data: Mapping[str, Any]) -> None:
+        if self._data is _NOT_LOADED or data != self._data:
+            self._data = dict(data)
+            self._data_changed = True
+
+    async def update_data(
+        self, data: Mapping[str, Any] | None = None, **kwargs: Any
+    ) -> dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        current = await self._load_data()
+        await self.set_data({**current, **kwargs})
+        return self._data.copy()
+
+    async def flush(self) -> None:
+        """Write the changed state and data to the storage."""
+
+        if self._state_changed:
+            await super().set_state(self._state)
+            self._state_changed = False
+        if self._data_changed:
+            await super().set_data(self._data)
+            self._data_changed = False
+
+
+class CachedFSMContextMiddleware(BaseMiddleware):
+    """
+    Replace the FSM context of the update with `CachedFSMContext`, so that
+    middlewares, filters and handlers share one read of the state and the
+    data, and write the changes back once after the update is handled.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        state: FSMContext | None = data.get('state')
+        if state is None:
+            return await handler(event, data)
+
+        context = CachedFSMContext(state, raw_state=data.get('raw_state', _NOT_LOADED))
+        data['state'] = context
+
+        try:
+            return await handler(event, data)
+        finally:
+            await context.flush()
@@ -6,8 +6,7 @@ from typing import Any
 from aiogram import BaseMiddleware
 from aiogram.fsm.context import FSMContext
 from aiogram.types import TelegramObject, User
-from psycopg import AsyncConnection
-from app.infrastructure.database.db import get_user_lang
+from app.infrastructure.database.models import UserProfile
 
 logger = logging.getLogger(__name__)
 
@@ -30,23 +29,20 @@ class TranslatorMiddleware(BaseMiddleware):
         user_context_data = await state.get_data()
 
         if (user_lang := user_context_data.get('user_lang')) is None:
-            conn: AsyncConnection = data.get('conn')
-            if conn is None:
-                logger.error('Database connection not found in middleware data.')
-                raise RuntimeError(
-                    "Missing database connection for detecting the user's language."
-                )
-
-            user_lang: str | None = await get_user_lang(conn, user_id=user.id)
-            if user_lang is None:
+            user_profile: UserProfile | None = data.get('user_profile')
+            if user_profile is None:
                 user_lang = user.language_code
+            else:
+                user_lang = user_profile.language
 
         translations: dict = data.get('translations')
         i18n: dict = translations.get(user_lang)
 
         if i18n is None:
+            data['lang'] = translations['default']
             data['i18n'] = translations[translations['default']]
         else:
+            data['lang'] = user_lang
             data['i18n'] = i18n
 
         return await handler(event, data)
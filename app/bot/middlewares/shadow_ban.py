@@ -5,8 +5,7 @@ from typing import Any
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Update, User
-from app.infrastructure.database.db import get_user_banned_status_by_id
-from psycopg import AsyncConnection
+from app.infrastructure.cache.banned import BannedUsers
 
 logger = logging.getLogger(__name__)
 
@@ -22,14 +21,12 @@ class ShadowBanMiddleware(BaseMiddleware):
         if user is None:
             return await handler(event, data)
 
-        conn: AsyncConnection = data.get('conn')
-        if conn is None:
-            logger.error('Database connection not found in middleware data.')
-            raise RuntimeError('Missing database connection for shadow ban check.')
+        banned_users: BannedUsers = data.get('banned_users')
+        if banned_users is None:
+            logger.error('Banned users set not found in middleware data.')
+            raise RuntimeError('Missing banned users set for shadow ban check.')
 
-        user_banned_status = get_user_banned_status_by_id(conn, user_id=user.id)
-
-        if user_banned_status:
+        if user.id in banned_users:
             logger.warning('Shadow-banned user tried to interact: %d', user.id)
             if event.callback_query:
                 await event.callback_query.answer()
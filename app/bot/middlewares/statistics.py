@@ -5,8 +5,9 @@ from typing import Any
 
 from aiogram import BaseMiddleware
 from aiogram.types import Update, User
-from app.infrastructure.database.db import add_user_activity
-from psycopg import AsyncConnection
+from app.infrastructure.activity.buffer import ActivityBuffer
+from app.infrastructure.activity.leaderboard import Leaderboard
+from app.infrastructure.activity.redis_counter import RedisActivityCounter
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +19,7 @@ class ActivityCounterMiddleware(BaseMiddleware):
         event: Update,
         data: dict[str, Any],
     ) -> Any:
-        """Add user activity to database."""
+        """Count user activity to be written to database."""
 
         user = data.get('event_from_user')
         if user is None:
@@ -26,11 +27,17 @@ class ActivityCounterMiddleware(BaseMiddleware):
 
         result = await handler(event, data)
 
-        conn: AsyncConnection = data.get('conn')
-        if conn is None:
-            logger.error('No database connection found in middleware data.')
-            raise RuntimeError('Missing database connection for activity logging.')
+        activity_buffer: ActivityBuffer | RedisActivityCounter = data.get(
+            'activity_buffer'
+        )
+        if activity_buffer is None:
+            logger.error('No activity buffer found in middleware data.')
+            raise RuntimeError('Missing activity buffer for activity logging.')
 
-        await add_user_activity(conn, user_id=user.id)
+        await activity_buffer.add(user.id)
+
+        leaderboard: Leaderboard | None = data.get('leaderboard')
+        if leaderboard is not None:
+            await leaderboard.incr(user.id)
 
         return result
@@ -0,0 +1,66 @@
+import logging
+
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User
+from app.infrastructure.throttling.buckets import MemoryTokenBuckets, RedisTokenBuckets
+
+logger = logging.getLogger(__name__)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Drop updates of users who exceed the rate limit for the update type.
+    If `warn` is set, the user gets one warning per flood, the rest of
+    the dropped updates are ignored silently.
+    """
+
+    def __init__(
+        self,
+        limiter: MemoryTokenBuckets | RedisTokenBuckets,
+        warn: bool = True,
+        max_warned: int = 10_000,
+    ) -> None:
+        self.limiter = limiter
+        self.warn = warn
+        self.max_warned = max_warned
+        self._warned: OrderedDict[int, None] = OrderedDict()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        user: User = data.get('event_from_user')
+        if user is None:
+            return await handler(event, data)
+
+        if await self.limiter.consume(user.id, event.event_type):
+            self._warned.pop(user.id, None)
+            return await handler(event, data)
+
+        logger.debug('Throttled %s update of user %d', event.event_type, user.id)
+
+        if self.warn and user.id not in self._warned:
+            self._warned[user.id] = None
+            while len(self._warned) > self.max_warned:
+                self._warned.popitem(last=False)
+            await self._send_warning(event, user, data.get('translations'))
+
+        return None
+
+    @staticmethod
+    async def _send_warning(event: Update, user: User, translations: dict) -> None:
+        i18n: dict = translations.get(user.language_code) or translations[
+            translations['default']
+        ]
+        text = i18n.get('throttled')
+
+        if event.message:
+            await event.message.answer(text=text)
+        elif event.callback_query:
+            await event.callback_query.answer(text=text)
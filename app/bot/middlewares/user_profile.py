@@ -0,0 +1,56 @@
+import logging
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+from app.infrastructure.cache.shared import SharedProfileCache
+from app.infrastructure.database.connection import LazyConnection
+from app.infrastructure.database.db import get_user_profile
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfileMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """
+        Take the user's profile from the cache or load it with a single query
+        and put it to `workflow_data` for the rest of middlewares, filters
+        and handlers.
+        """
+
+        user: User = data.get('event_from_user')
+        if user is None:
+            data['user_profile'] = None
+            return await handler(event, data)
+
+        profile_cache: SharedProfileCache | None = data.get('profile_cache')
+        if profile_cache is not None:
+            user_profile = await profile_cache.get(user.id)
+            if user_profile is not None:
+                data['user_profile'] = user_profile
+                return await handler(event, data)
+
+        conn: LazyConnection = data.get('conn')
+        if conn is None:
+            logger.error('Database connection not found in middleware data.')
+            raise RuntimeError('Missing database connection for loading user profile.')
+
+        # Taken before the load, so that a profile changed meanwhile is not cached
+        version: int | None = None
+        if profile_cache is not None:
+            version = await profile_cache.version(user.id)
+
+        user_profile = await get_user_profile(conn, user_id=user.id)
+        if user_profile is not None and profile_cache is not None:
+            await profile_cache.set(user_profile, version=version)
+
+        data['user_profile'] = user_profile
+
+        return await handler(event, data)
@@ -0,0 +1,80 @@
+import asyncio
+
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+T = TypeVar('T')
+
+
+class _ChatQueue:
+    __slots__ = ('lock', 'size')
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.size = 0
+
+
+class UpdateScheduler:
+    """
+    Runs updates of different chats concurrently, at most `max_concurrency`
+    at a time, and updates of one chat strictly one after another in the
+    order they arrived.
+
+    Every chat with updates in flight has a FIFO queue. The queue is
+    dropped as soon as it becomes empty, so idle chats take no memory.
+    """
+
+    def __init__(self, max_concurrency: int = 100) -> None:
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._queues: dict[int, _ChatQueue] = {}
+
+    @property
+    def active_chats(self) -> int:
+        """Number of chats with updates waiting or in progress."""
+
+        return len(self._queues)
+
+    @staticmethod
+    def chat_key(update: Update) -> int | None:
+        context = UserContextMiddleware.resolve_event_context(update)
+        return context.chat_id if context.chat_id is not None else context.user_id
+
+    async def run(self, key: int | None, func: Callable[[], Awaitable[T]]) -> T:
+        """Run `func` after all the earlier calls with the same key finished."""
+
+        if key is None:
+            async with self._slots:
+                return await func()
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _ChatQueue()
+        queue.size += 1
+
+        try:
+            # asyncio.Lock wakes up its waiters in FIFO order
+            async with queue.lock, self._slots:
+                return await func()
+        finally:
+            queue.size -= 1
+            if not queue.size:
+                del self._queues[key]
+
+
+class ScheduledDispatcher(Dispatcher):
+    """Dispatcher that feeds every update through `UpdateScheduler`."""
+
+    def __init__(self, *args: Any, scheduler: UpdateScheduler, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler
+
+    async def feed_update(self, bot: Bot, update: Update, **kwargs: Any) -> Any:
+        return await self.scheduler.run(
+            self.scheduler.chat_key(update),
+            lambda: super(ScheduledDispatcher, self).feed_update(bot, update, **kwargs)
+        )
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+import socket
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config.config import Config, WebhookConfig
+
+logger = logging.getLogger(__name__)
+
+
+def create_socket(host: str, port: int) -> socket.socket:
+    """Create the listening socket shared by all the worker processes."""
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.setblocking(False)
+    sock.set_inheritable(True)
+    return sock
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Request handler that feeds updates in the background, at most
+    `max_pending` at a time. Further requests wait before they are
+    answered, so Telegram slows down instead of the backlog growing.
+    """
+
+    def __init__(self, *args: Any, max_pending: int, **kwargs: Any) -> None:
+        super().__init__(*args, handle_in_background=True, **kwargs)
+        self._pending = asyncio.Semaphore(max_pending)
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot, update)
+        finally:
+            self._pending.release()
+
+    async def _handle_request_background(
+        self, bot: Bot, request: web.Request
+    ) -> web.Response:
+        await self._pending.acquire()
+        try:
+            return await super()._handle_request_background(bot, request)
+        except BaseException:
+            # The update task was not started
+            self._pending.release()
+            raise
+
+
+async def run_webhook(
+    bot: Bot,
+    dp: Dispatcher,
+    config: WebhookConfig,
+    *,
+    sock: socket.socket | None = None,
+    set_webhook: bool = True,
+    max_pending: int = 1000,
+    **kwargs: Any,
+) -> None:
+    """
+    Serve updates sent by Telegram through the reverse proxy until the
+    process gets SIGINT or SIGTERM. At most `max_pending` updates are
+    handled or wait for `UpdateScheduler` at a time.
+    """
+
+    app = web.Application()
+    BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=config.secret or None,
+        max_pending=max_pending,
+        **kwargs
+    ).register(app, path=config.path)
+    setup_application(app, dp, bot=bot, **kwargs)
+
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    if sock is None:
+        site = web.TCPSite(runner, host=config.host, port=config.port)
+    else:
+        site = web.SockSite(runner, sock)
+    await site.start()
+
+    if set_webhook:
+        await bot.set_webhook(
+            url=f'{config.url.rstrip("/")}{config.path}',
+            secret_token=config.secret or None,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=config.max_connections
+        )
+        logger.info('Webhook is set to %s%s', config.url, config.path)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+
+
+BotMain = Callable[..., Awaitable[None]]
+
+
+def _run_worker(
+    main: BotMain, config: Config, sock: socket.socket, worker_index: int
+) -> None:
+    asyncio.run(main(config, sock=sock, worker_index=worker_index))
+
+
+def run_workers(config: Config, main: BotMain) -> None:
+    """
+    Fork `WEBHOOK_WORKERS` processes accepting updates from one shared
+    socket. Every worker has its own event loop and its own connection
+    pools sized by the config. Several workers are supported on Unix only.
+    """
+
+    sock = create_socket(config.webhook.host, config.webhook.port)
+    logger.info('Listening on %s:%d with %d workers',
+                config.webhook.host, config.webhook.port, config.webhook.workers)
+
+    if config.webhook.workers == 1:
+        _run_worker(main, config, sock, 0)
+        return
+
+    context = multiprocessing.get_context('fork')
+    workers = [
+        context.Process(
+            target=_run_worker,
+            args=(main, config, sock, worker_index),
+            name=f'bot-worker-{worker_index}'
+        )
+        for worker_index in range(config.webhook.workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def terminate(*args: Any) -> None:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+
+    signal.signal(signal.SIGTERM, terminate)
+    # Ctrl+C reaches the workers directly, the parent only waits for them
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    for worker in workers:
+        worker.join()
+        if worker.exitcode:
+            logger.error('Worker %s exited with code %d', worker.name, worker.exitcode)
+    sock.close()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+
+from collections import Counter
+from contextlib import suppress
+from datetime import date, datetime, timezone
+
+from psycopg import Error
+from psycopg_pool import AsyncConnectionPool
+
+from app.infrastructure.database.db import add_users_activity
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer:
+    """
+    Write-behind aggregator of user activity. Increments are merged per
+    `(user_id, activity_date)` in memory and written to the `activity` table
+    with one multi-row upsert every `flush_interval` seconds or as soon as
+    `max_pending` distinct rows are accumulated.
+    """
+
+    def __init__(
+        self,
+        db_pool: AsyncConnectionPool,
+        flush_interval: float = 5.0,
+        max_pending: int = 1000,
+    ) -> None:
+        self.db_pool = db_pool
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Counter[tuple[int, date]] = Counter()
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def add(self, user_id: int, actions: int = 1) -> None:
+        """Count user's actions for today."""
+
+        self._pending[(user_id, datetime.now(timezone.utc).date())] += actions
+
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    async def flush(self) -> bool:
+        """
+        Write all the accumulated activity to the database. Return `False`
+        if it failed and the activity is kept for the next flush.
+        """
+
+        async with self._flush_lock:
+            if not self._pending:
+                return True
+
+            pending, self._pending = self._pending, Counter()
+            rows = [
+                (user_id, activity_date, actions)
+                for (user_id, activity_date), actions in sorted(pending.items())
+            ]
+
+            try:
+                async with self.db_pool.connection() as conn:
+                    await add_users_activity(conn, rows=rows)
+            except Error as e:
+                logger.error(
+                    'Failed to flush %d activity rows, keeping them: %s',
+                    len(rows), e
+                )
+                self._pending.update(pending)
+                return False
+
+            return True
+
+    async def _run(self) -> None:
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self._flush_requested.wait(),
+                    timeout=self.flush_interval
+                )
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception('Unexpected error while flushing activity: %s', e)
+
+    async def start(self) -> None:
+        """Start periodic flushing."""
+
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic flushing and flush what is left."""
+
+        if self._worker is not None:
+            self._worker.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
+
+        await self.flush()
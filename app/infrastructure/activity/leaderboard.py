@@ -0,0 +1,161 @@
+import asyncio
+import logging
+
+from contextlib import suppress
+from typing import Protocol
+
+from psycopg import Error
+from psycopg_pool import AsyncConnectionPool
+from redis.asyncio import Redis
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError, RedisError
+
+from app.infrastructure.database.db import iter_activity_totals
+
+logger = logging.getLogger(__name__)
+
+# Increments made during a rebuild are also recorded in the delta set
+_INCR_SCRIPT = """
+redis.call('ZINCRBY', KEYS[1], ARGV[1], ARGV[2])
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('ZINCRBY', KEYS[2], ARGV[1], ARGV[2])
+end
+"""
+
+
+class ActivityFlusher(Protocol):
+    async def flush(self) -> bool: ...
+
+
+class Leaderboard:
+    """
+    Real-time leaderboard of user actions kept in a Redis sorted set.
+
+    Scores are incremented on every counted action and periodically
+    rebuilt from `activity_totals`, so that the set does not drift from
+    the database. Before the rebuild starts, increments are also written
+    to a delta set. Then the activity counter is flushed, so the totals
+    include every action counted before that. The rebuild is skipped if
+    the flush could not write everything. The rebuilt set is swapped in
+    together with the delta by `ZUNIONSTORE`, so readers never see a
+    half-built set. Actions counted in the moment between the start of
+    the rebuild and the flush may be added twice, until the next rebuild.
+
+    Only the activity counter of this process is flushed, so with the
+    in-memory `ActivityBuffer` all the updates must be handled by one
+    process. The Redis counter is shared and is drained as a whole.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        db_pool: AsyncConnectionPool,
+        reconcile_interval: float = 3600.0,
+        key: str = 'leaderboard',
+        activity: ActivityFlusher | None = None,
+    ) -> None:
+        self.redis = redis
+        self.db_pool = db_pool
+        self.reconcile_interval = reconcile_interval
+        self.key = key
+        self.activity = activity
+        self._lock_key = f'{key}:reconcile_lock'
+        self._rebuild_key = f'{key}:rebuild'
+        self._delta_key = f'{key}:delta'
+        self._rebuilding_key = f'{key}:rebuilding'
+        self._lock_timeout = 120
+        self._incr = redis.register_script(_INCR_SCRIPT)
+        self._worker: asyncio.Task | None = None
+
+    async def incr(self, user_id: int, actions: int = 1) -> None:
+        """Add user's actions to the leaderboard."""
+
+        try:
+            await self._incr(
+                keys=[self.key, self._delta_key, self._rebuilding_key],
+                args=[actions, str(user_id)]
+            )
+        except RedisError as e:
+            logger.error('Failed to update leaderboard for user %d: %s', user_id, e)
+
+    async def top(self, limit: int = 5) -> list[tuple[int, int]]:
+        """Return `(user_id, total_actions)` of the most active users."""
+
+        rows = await self.redis.zrevrange(self.key, 0, limit - 1, withscores=True)
+
+        return [(int(user_id), int(score)) for user_id, score in rows]
+
+    async def reconcile(self) -> None:
+        """Rebuild the leaderboard from the `activity_totals` table."""
+
+        lock = self.redis.lock(self._lock_key, timeout=self._lock_timeout, blocking=False)
+        if not await lock.acquire():
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(self._rebuild_key, self._delta_key)
+                pipe.set(self._rebuilding_key, 1, ex=self._lock_timeout)
+                await pipe.execute()
+
+            if self.activity is not None and not await self.activity.flush():
+                logger.warning('Activity is not flushed, leaderboard is not reconciled')
+                await self._discard()
+                return
+            await self._extend(lock)
+
+            async with self.db_pool.connection() as conn:
+                async for rows in iter_activity_totals(conn):
+                    await self.redis.zadd(
+                        self._rebuild_key,
+                        {str(user_id): total for user_id, total in rows}
+                    )
+                    await self._extend(lock)
+
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zunionstore(self.key, [self._rebuild_key, self._delta_key])
+                pipe.delete(self._rebuild_key, self._delta_key, self._rebuilding_key)
+                await pipe.execute()
+
+            logger.info('Leaderboard reconciled with table=`activity_totals`')
+        except LockError:
+            # Another instance may be rebuilding already, its keys are kept
+            logger.error('Leaderboard reconcile lock is lost')
+        except (Error, RedisError) as e:
+            logger.error('Failed to reconcile leaderboard: %s', e)
+            with suppress(RedisError):
+                await self._discard()
+        finally:
+            with suppress(LockError, RedisError):
+                await lock.release()
+
+    async def _extend(self, lock: Lock) -> None:
+        # The delta must be recorded for as long as the lock is held
+        await lock.reacquire()
+        await self.redis.expire(self._rebuilding_key, self._lock_timeout)
+
+    async def _discard(self) -> None:
+        await self.redis.delete(self._rebuilding_key, self._rebuild_key, self._delta_key)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.exception('Unexpected error while reconciling leaderboard: %s', e)
+            await asyncio.sleep(self.reconcile_interval)
+
+    async def start(self) -> None:
+        """Start periodic reconciliation."""
+
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic reconciliation."""
+
+        if self._worker is not None:
+            self._worker.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
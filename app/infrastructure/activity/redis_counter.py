@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import uuid
+
+from contextlib import suppress
+from datetime import date, datetime, timezone
+
+from psycopg import Error
+from psycopg_pool import AsyncConnectionPool
+from redis.asyncio import Redis
+from redis.exceptions import LockError, RedisError, ResponseError
+
+from app.infrastructure.database.db import add_users_activity, delete_activity_drain
+
+logger = logging.getLogger(__name__)
+
+
+class RedisActivityCounter:
+    """
+    Activity counter that records increments in Redis hashes, one per day
+    (`activity:<date>`, field is user id), and periodically drains them to
+    the `activity` table in bulk.
+
+    A day hash is atomically renamed to `activity:draining:<date>:<drain id>`
+    before it is read, so increments made during a drain go to a fresh
+    hash. The draining hash is deleted only after it was written to
+    Postgres, so it is retried on the next drain if the write failed or
+    the process died. Drains in progress are tracked in the
+    `activity:drains` set, so the leftovers are found without scanning
+    the keyspace.
+
+    The drain id is recorded in `activity_drains` in the same transaction
+    as the activity, so a drain that was written but not deleted from
+    Redis is not counted twice when it is retried. The drain lock is
+    extended before every hash, and a lost lock stops the drain.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        db_pool: AsyncConnectionPool,
+        drain_interval: float = 5.0,
+        key_prefix: str = 'activity',
+    ) -> None:
+        self.redis = redis
+        self.db_pool = db_pool
+        self.drain_interval = drain_interval
+        self.key_prefix = key_prefix
+        self._days_key = f'{key_prefix}:days'
+        self._drains_key = f'{key_prefix}:drains'
+        self._lock_key = f'{key_prefix}:drain_lock'
+        self._worker: asyncio.Task | None = None
+
+    def _day_key(self, day: str) -> str:
+        return f'{self.key_prefix}:{day}'
+
+    def _draining_key(self, drain: str) -> str:
+        return f'{self.key_prefix}:draining:{drain}'
+
+    async def add(self, user_id: int, actions: int = 1) -> None:
+        """Count user's actions for today."""
+
+        day = datetime.now(timezone.utc).date().isoformat()
+
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.sadd(self._days_key, day)
+                pipe.hincrby(self._day_key(day), str(user_id), actions)
+                await pipe.execute()
+        except RedisError as e:
+            logger.error('Failed to count activity of user %d: %s', user_id, e)
+
+    async def _write_draining(self, drain: str) -> None:
+        key = self._draining_key(drain)
+        raw = await self.redis.hgetall(key)
+
+        if raw:
+            activity_date = date.fromisoformat(drain.split(':', 1)[0])
+            rows = sorted(
+                (int(user_id), activity_date, int(actions))
+                for user_id, actions in raw.items()
+            )
+            async with self.db_pool.connection() as conn:
+                await add_users_activity(conn, rows=rows, drain_id=drain)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.srem(self._drains_key, drain)
+            await pipe.execute()
+
+        if raw:
+            async with self.db_pool.connection() as conn:
+                await delete_activity_drain(conn, drain_id=drain)
+
+    async def flush(self) -> bool:
+        """
+        Move all the counted activity from Redis to the database. Return
+        `False` if it failed or another instance is draining right now.
+        """
+
+        lock = self.redis.lock(self._lock_key, timeout=60, blocking=False)
+        if not await lock.acquire():
+            return False
+
+        try:
+            # Leftovers of a drain that failed before
+            for raw_drain in await self.redis.smembers(self._drains_key):
+                await lock.reacquire()
+                await self._write_draining(raw_drain.decode())
+
+            for raw_day in await self.redis.smembers(self._days_key):
+                await lock.reacquire()
+                day = raw_day.decode()
+                drain = f'{day}:{uuid.uuid4().hex}'
+                try:
+                    async with self.redis.pipeline(transaction=True) as pipe:
+                        pipe.rename(self._day_key(day), self._draining_key(drain))
+                        pipe.srem(self._days_key, day)
+                        pipe.sadd(self._drains_key, drain)
+                        await pipe.execute()
+                except ResponseError:
+                    # The day hash is already gone, forget about the day
+                    async with self.redis.pipeline(transaction=True) as pipe:
+                        pipe.srem(self._days_key, day)
+                        pipe.srem(self._drains_key, drain)
+                        await pipe.execute()
+                    continue
+
+                await self._write_draining(drain)
+        except LockError:
+            logger.error('Activity drain lock is lost, leaving the rest to another instance')
+            return False
+        except (Error, RedisError) as e:
+            logger.error('Failed to drain activity from Redis: %s', e)
+            return False
+        finally:
+            with suppress(LockError, RedisError):
+                await lock.release()
+
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.drain_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception('Unexpected error while draining activity: %s', e)
+
+    async def start(self) -> None:
+        """Start periodic draining."""
+
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic draining and drain what is left."""
+
+        if self._worker is not None:
+            self._worker.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
+
+        await self.flush()
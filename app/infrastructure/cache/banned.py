@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import uuid
+
+from contextlib import suppress
+
+from psycopg_pool import AsyncConnectionPool
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.infrastructure.database.db import get_banned_user_ids
+
+logger = logging.getLogger(__name__)
+
+
+class BannedUsers:
+    """
+    In-memory set of banned user ids, so that the shadow ban check never
+    touches the database.
+
+    The set is loaded from the `users` table once the subscription to
+    the changes is established, and reloaded whenever it is re-established,
+    since changes published in between are lost. Every change is
+    published over Redis, so all the bot instances apply it. Changes made
+    while the set is loaded are applied on top of the loaded set.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        db_pool: AsyncConnectionPool,
+        channel: str = 'banned:changes',
+    ) -> None:
+        self.redis = redis
+        self.db_pool = db_pool
+        self.channel = channel
+        self.instance_id = uuid.uuid4().hex
+        self._ids: set[int] = set()
+        self._changes: list[tuple[str, tuple[int, ...]]] | None = None
+        self._loaded = asyncio.Event()
+        self._load_lock = asyncio.Lock()
+        self._listener: asyncio.Task | None = None
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def load(self) -> None:
+        """Replace the set with the banned users from the database."""
+
+        async with self._load_lock:
+            self._changes = []
+            try:
+                async with self.db_pool.connection() as conn:
+                    ids = set(await get_banned_user_ids(conn))
+                # The query may have missed the changes made meanwhile
+                for op, user_ids in self._changes:
+                    self._apply(ids, op, user_ids)
+                self._ids = ids
+            finally:
+                self._changes = None
+        logger.info('Loaded %d banned users', len(self._ids))
+
+    def _change(self, op: str, user_ids: tuple[int, ...]) -> None:
+        self._apply(self._ids, op, user_ids)
+        if self._changes is not None:
+            self._changes.append((op, user_ids))
+
+    @staticmethod
+    def _apply(ids: set[int], op: str, user_ids: tuple[int, ...]) -> None:
+        if op == '+':
+            ids.update(user_ids)
+        else:
+            ids.difference_update(user_ids)
+
+    async def add(self, *user_ids: int) -> None:
+        """Mark users as banned on every instance."""
+
+        self._change('+', user_ids)
+        await self._publish('+', user_ids)
+
+    async def discard(self, *user_ids: int) -> None:
+        """Mark users as not banned on every instance."""
+
+        self._change('-', user_ids)
+        await self._publish('-', user_ids)
+
+    async def _publish(self, op: str, user_ids: tuple[int, ...]) -> None:
+        if not user_ids:
+            return
+
+        message = f"{self.instance_id}:{op}:{','.join(map(str, user_ids))}"
+        try:
+            await self.redis.publish(self.channel, message)
+        except RedisError as e:
+            logger.error('Failed to publish banned users change: %s', e)
+
+    def _handle_message(self, data: bytes) -> None:
+        instance_id, op, user_ids = data.decode().split(':', 2)
+        if instance_id == self.instance_id:
+            return
+
+        self._change(op, tuple(int(user_id) for user_id in user_ids.split(',')))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    await self.load()
+                    self._loaded.set()
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            self._handle_message(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error('Banned users listener failed: %s', e)
+                await asyncio.sleep(1)
+
+    async def start(self, timeout: float = 10.0) -> None:
+        """
+        Start listening to changes from other instances and wait until
+        the set is loaded. If Redis does not respond within `timeout`
+        seconds, the set is loaded without the subscription.
+        """
+
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+        try:
+            await asyncio.wait_for(self._loaded.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning('Banned users are loaded before subscribing to changes')
+            await self.load()
+
+    async def stop(self) -> None:
+        """Stop listening to changes."""
+
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
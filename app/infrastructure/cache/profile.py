@@ -0,0 +1,120 @@
+import logging
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any
+
+from app.infrastructure.database.models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    size: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ProfileCache:
+    """Bounded in-process cache of user profiles with TTL and LRU eviction."""
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 300.0) -> None:
+        if max_size <= 0:
+            raise ValueError('max_size must be positive')
+        if ttl <= 0:
+            raise ValueError('ttl must be positive')
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, UserProfile]] = OrderedDict()
+        self._stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._entries
+
+    @property
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the cache counters."""
+
+        return replace(self._stats, size=len(self._entries))
+
+    def get(self, user_id: int) -> UserProfile | None:
+        """Return a cached profile or `None` if it is missing or expired."""
+
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self._stats.misses += 1
+            return None
+
+        expires_at, profile = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self._stats.expirations += 1
+            self._stats.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self._stats.hits += 1
+        return profile
+
+    def set(self, profile: UserProfile) -> None:
+        """Put a profile to the cache, evicting the least recently used one."""
+
+        self._entries[profile.user_id] = (time.monotonic() + self.ttl, profile)
+        self._entries.move_to_end(profile.user_id)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def update(self, user_id: int, **fields: Any) -> None:
+        """Update fields of a cached profile in place, if it is cached."""
+
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+
+        expires_at, profile = entry
+        self._entries[user_id] = (expires_at, replace(profile, **fields))
+
+    def invalidate(self, *user_ids: int) -> None:
+        """Drop the given users from the cache."""
+
+        for user_id in user_ids:
+            if self._entries.pop(user_id, None) is not None:
+                self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop all the entries from the cache."""
+
+        self._entries.clear()
+
+    def log_stats(self) -> None:
+        """Log the current cache counters."""
+
+        stats = self.stats
+        logger.info(
+            "Profile cache: size=%d/%d, hits=%d, misses=%d, hit_ratio=%.2f, "
+            "evictions=%d, expirations=%d, invalidations=%d",
+            stats.size,
+            self.max_size,
+            stats.hits,
+            stats.misses,
+            stats.hit_ratio,
+            stats.evictions,
+            stats.expirations,
+            stats.invalidations,
+        )
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import uuid
+
+from contextlib import suppress
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.bot.enums.roles import UserRole
+from app.infrastructure.cache.profile import ProfileCache
+from app.infrastructure.database.models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+# Write the profile only if it was not invalidated since it was read
+_FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class SharedProfileCache:
+    """
+    Two-tier cache of user profiles: per-process `ProfileCache` in front of
+    Redis hashes shared by all the bot instances. Every write publishes
+    the changed user ids so that other instances drop them from their L1.
+
+    Every invalidation also increments the version of the profile
+    (`profile:ver:<user_id>`). A profile loaded from the database is
+    cached only if its version did not change since before the load,
+    so a profile read before an invalidation never overwrites it.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        local: ProfileCache,
+        ttl: int = 3600,
+        key_prefix: str = 'profile',
+        channel: str = 'profile:invalidate',
+    ) -> None:
+        self.redis = redis
+        self.local = local
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.channel = channel
+        self.instance_id = uuid.uuid4().hex
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self._listener: asyncio.Task | None = None
+        self._fill = redis.register_script(_FILL_SCRIPT)
+
+    def _key(self, user_id: int) -> str:
+        return f'{self.key_prefix}:{user_id}'
+
+    def _version_key(self, user_id: int) -> str:
+        return f'{self.key_prefix}:ver:{user_id}'
+
+    @staticmethod
+    def _encode(profile: UserProfile) -> dict[str, str]:
+        return {
+            'user_id': str(profile.user_id),
+            'role': UserRole(profile.role).value,
+            'language': profile.language,
+            'is_alive': str(int(profile.is_alive)),
+            'banned': str(int(profile.banned)),
+        }
+
+    @staticmethod
+    def _decode(raw: dict[bytes, bytes]) -> UserProfile:
+        fields = {key.decode(): value.decode() for key, value in raw.items()}
+        return UserProfile(
+            user_id=int(fields['user_id']),
+            role=UserRole(fields['role']),
+            language=fields['language'],
+            is_alive=fields['is_alive'] == '1',
+            banned=fields['banned'] == '1',
+        )
+
+    async def get(self, user_id: int) -> UserProfile | None:
+        """Return a profile from L1, then from Redis, or `None` on miss."""
+
+        profile = self.local.get(user_id)
+        if profile is not None:
+            return profile
+
+        try:
+            raw = await self.redis.hgetall(self._key(user_id))
+        except RedisError as e:
+            logger.warning('Failed to read profile %d from Redis: %s', user_id, e)
+            return None
+
+        if not raw:
+            self.l2_misses += 1
+            return None
+
+        self.l2_hits += 1
+        profile = self._decode(raw)
+        self.local.set(profile)
+        return profile
+
+    async def version(self, user_id: int) -> int | None:
+        """
+        Return the version of a profile, to be passed to `set` after the
+        profile is loaded, or `None` if Redis is unavailable.
+        """
+
+        try:
+            raw = await self.redis.get(self._version_key(user_id))
+        except RedisError as e:
+            logger.warning('Failed to read profile %d version: %s', user_id, e)
+            return None
+
+        return int(raw) if raw else 0
+
+    async def set(self, profile: UserProfile, *, version: int | None) -> None:
+        """
+        Put a profile loaded at `version` to both tiers, unless it was
+        invalidated since. With `version=None` it is only kept in L1.
+        """
+
+        # L1 is filled first, so a later invalidation always clears it
+        self.local.set(profile)
+        if version is None:
+            return
+
+        fields = self._encode(profile)
+        try:
+            filled = await self._fill(
+                keys=[self._key(profile.user_id), self._version_key(profile.user_id)],
+                args=[version, self.ttl, *(v for item in fields.items() for v in item)]
+            )
+        except RedisError as e:
+            logger.warning(
+                'Failed to write profile %d to Redis: %s', profile.user_id, e
+            )
+            return
+
+        if not filled:
+            self.local.invalidate(profile.user_id)
+
+    async def update(self, user_id: int, **fields: Any) -> None:
+        """
+        Update a profile in the local tier and drop it from Redis and
+        the other instances.
+        """
+
+        await self._drop_shared(user_id)
+        self.local.update(user_id, **fields)
+
+    async def invalidate(self, *user_ids: int) -> None:
+        """Drop profiles from both tiers on every instance."""
+
+        if not user_ids:
+            return
+
+        # Redis goes first, so a concurrent `set` either sees the new
+        # version or has filled L1 before it is cleared here
+        await self._drop_shared(*user_ids)
+        self.local.invalidate(*user_ids)
+
+    async def _drop_shared(self, *user_ids: int) -> None:
+        message = f"{self.instance_id}:{','.join(map(str, user_ids))}"
+
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for user_id in user_ids:
+                    pipe.incr(self._version_key(user_id))
+                    pipe.expire(self._version_key(user_id), self.ttl)
+                pipe.delete(*(self._key(user_id) for user_id in user_ids))
+                pipe.publish(self.channel, message)
+                await pipe.execute()
+        except RedisError as e:
+            logger.error('Failed to publish profile invalidation: %s', e)
+
+    def _handle_message(self, data: bytes) -> None:
+        instance_id, _, user_ids = data.decode().partition(':')
+        if instance_id == self.instance_id:
+            return
+
+        self.local.invalidate(*(int(user_id) for user_id in user_ids.split(',')))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    # Messages published while we were not subscribed are lost
+                    self.local.clear()
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            self._handle_message(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error('Profile invalidation listener failed: %s', e)
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        """Start listening to invalidations from other instances."""
+
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop listening to invalidations."""
+
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+    def log_stats(self) -> None:
+        """Log the counters of both tiers."""
+
+        self.local.log_stats()
+        logger.info(
+            'Shared profile cache: l2_hits=%d, l2_misses=%d',
+            self.l2_hits,
+            self.l2_misses,
+        )
@@ -1,11 +1,168 @@
+import functools
 import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, ParamSpec, TypeVar
 from urllib.parse import quote
 
-from psycopg import AsyncConnection
-from psycopg_pool import AsyncConnectionPool
+from psycopg import AsyncConnection, AsyncCursor, AsyncPipeline, OperationalError
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from app.infrastructure.database.replica import ReplicaRouter
 
 logger = logging.getLogger(__name__)
 
+P = ParamSpec('P')
+T = TypeVar('T')
+
+
+class ReplicaQueryError(OperationalError):
+    """A query failed on the read replica, which is now out of rotation."""
+
+
+class LazyConnection:
+    """
+    Stand-in for `AsyncConnection` that takes a connection from the pool
+    only for the time a query runs.
+
+    Every `cursor()` block checks a connection out, runs in its own
+    transaction and returns the connection to the pool on exit. Inside
+    a `transaction()` block all the cursors share one pinned connection
+    and are committed together. Inside a `pipeline()` block the pinned
+    connection works in pipeline mode, so queries are sent without waiting
+    for the results of the previous ones.
+
+    `read_cursor()` serves read-only queries from the replica, if there is
+    one in rotation. Once anything went through the primary, the rest of
+    the reads stick to it, so they see the writes made before. If a query
+    fails on the replica, the replica is taken out of rotation and
+    `ReplicaQueryError` is raised, so that the query can be retried on the
+    primary with `retry_on_primary`.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        replica: ReplicaRouter | None = None,
+    ) -> None:
+        self.pool = pool
+        self.replica = replica
+        self._pinned: AsyncConnection | None = None
+        self._used_primary = False
+
+    @asynccontextmanager
+    async def cursor(self, *args: Any, **kwargs: Any) -> AsyncIterator[AsyncCursor]:
+        self._used_primary = True
+
+        if self._pinned is not None:
+            async with self._pinned.cursor(*args, **kwargs) as cursor:
+                yield cursor
+            return
+
+        async with self.pool.connection() as connection:
+            async with connection.cursor(*args, **kwargs) as cursor:
+                yield cursor
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator['LazyConnection']:
+        if self._pinned is not None:
+            async with self._pinned.transaction():
+                yield self
+            return
+
+        self._used_primary = True
+
+        async with self.pool.connection() as connection:
+            self._pinned = connection
+            try:
+                # Explicit, so it is a transaction on autocommit pools too
+                async with connection.transaction():
+                    yield self
+            finally:
+                self._pinned = None
+
+    @asynccontextmanager
+    async def read_cursor(
+        self, *args: Any, **kwargs: Any
+    ) -> AsyncIterator[AsyncCursor]:
+        if (
+            self.replica is not None
+            and self.replica.available
+            and not self._used_primary
+        ):
+            async with AsyncExitStack() as stack:
+                try:
+                    connection = await stack.enter_async_context(
+                        self.replica.pool.connection(
+                            timeout=self.replica.checkout_timeout
+                        )
+                    )
+                except (OperationalError, PoolTimeout) as e:
+                    self.replica.mark_unavailable(e)
+                else:
+                    try:
+                        async with connection.cursor(*args, **kwargs) as cursor:
+                            yield cursor
+                    except OperationalError as e:
+                        self.replica.mark_unavailable(e)
+                        raise ReplicaQueryError(str(e)) from e
+                    return
+
+        async with self.cursor(*args, **kwargs) as cursor:
+            yield cursor
+
+    @asynccontextmanager
+    async def pipeline(self) -> AsyncIterator[AsyncPipeline]:
+        if self._pinned is not None:
+            async with self._pinned.pipeline() as pipeline:
+                yield pipeline
+            return
+
+        self._used_primary = True
+
+        async with self.pool.connection() as connection:
+            self._pinned = connection
+            try:
+                async with connection.pipeline() as pipeline:
+                    yield pipeline
+            finally:
+                self._pinned = None
+
+
+def read_cursor(
+    conn: AsyncConnection | LazyConnection,
+    *args: Any,
+    **kwargs: Any,
+) -> Any:
+    """
+    Return a cursor context for a read-only query, which may be served
+    by the read replica.
+    """
+
+    if isinstance(conn, LazyConnection):
+        return conn.read_cursor(*args, **kwargs)
+    return conn.cursor(*args, **kwargs)
+
+
+def retry_on_primary(
+    func: Callable[P, Awaitable[T]],
+) -> Callable[P, Awaitable[T]]:
+    """
+    Run a read-only database helper once more, on the primary, if its
+    query failed on the read replica.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+        try:
+            return await func(*args, **kwargs)
+        except ReplicaQueryError as e:
+            logger.warning('Retrying %s on the primary: %s', func.__name__, e)
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
 def build_pg_conninfo(
     db_name: str,
     host: str,
@@ -59,6 +216,28 @@ async def get_pg_connection(
         raise
 
 
+def make_pool_configure(
+    prepare_threshold: int | None,
+    autocommit: bool = False,
+) -> Callable[[AsyncConnection], Awaitable[None]]:
+    """
+    Return a callback that sets up every new pool connection to prepare
+    statements on the server after `prepare_threshold` executions
+    (`0` - on the first one, `None` - never).
+
+    psycopg keeps prepared statements per connection, so the fixed queries
+    from `db.py` are parsed and planned once per connection and then only
+    executed by name.
+    """
+
+    async def configure(connection: AsyncConnection) -> None:
+        connection.prepare_threshold = prepare_threshold
+        if autocommit:
+            await connection.set_autocommit(True)
+
+    return configure
+
+
 async def get_pg_pool(
     db_name: str,
     host: str,
@@ -68,6 +247,12 @@ async def get_pg_pool(
     min_size: int = 1,
     max_size: int = 3,
     timeout: float | None = 10.0,
+    max_waiting: int = 0,
+    max_lifetime: float = 3600.0,
+    max_idle: float = 600.0,
+    reconnect_timeout: float = 300.0,
+    prepare_threshold: int | None = 5,
+    autocommit: bool = False,
 ) -> AsyncConnectionPool:
     """Return a PostgreSQL connection pool."""
 
@@ -80,6 +265,11 @@ async def get_pg_pool(
             min_size=min_size,
             max_size=max_size,
             timeout=timeout,
+            max_waiting=max_waiting,
+            max_lifetime=max_lifetime,
+            max_idle=max_idle,
+            reconnect_timeout=reconnect_timeout,
+            configure=make_pool_configure(prepare_threshold, autocommit),
             open=False,
         )
         await db_pool.open()
@@ -1,8 +1,15 @@
 import logging
-from datetime import datetime, timezone
+from collections.abc import AsyncIterator
+from datetime import date, datetime, timezone
 from typing import Any
 
 from app.bot.enums.roles import UserRole
+from app.infrastructure.database.connection import (
+    LazyConnection,
+    read_cursor,
+    retry_on_primary,
+)
+from app.infrastructure.database.models import UserProfile
 from psycopg import AsyncConnection
 
 logger = logging.getLogger(__name__)
@@ -54,33 +61,109 @@ async def add_user(
         )
 
 
-async def get_user(
+async def upsert_user_on_start(
     conn: AsyncConnection,
     *,
     user_id: int,
-) -> tuple[Any, ...] | None:
-    """Get a user from the database."""
+    username: str | None = None,
+    language: str = "ru",
+    role: UserRole = UserRole.USER,
+) -> UserProfile:
+    """
+    Add a new user or mark an existing one as alive and return the
+    user's profile, all in one statement. `language` and `role` are
+    applied to new users only.
+    """
+
+    async with conn.cursor() as cursor:
+        data = await cursor.execute(
+            query="""
+                  INSERT INTO users(user_id, username, language, role, is_alive, banned)
+                  VALUES (%(user_id)s,
+                          %(username)s,
+                          %(language)s,
+                          %(role)s,
+                          TRUE,
+                          FALSE)
+                  ON CONFLICT (user_id)
+                  DO UPDATE
+                  SET is_alive = TRUE
+                  RETURNING role, language, is_alive, banned;
+                  """,
+            params={
+                "user_id": user_id,
+                "username": username,
+                "language": language,
+                "role": role,
+            },
+        )
+        row = await data.fetchone()
+    logger.info("User %d started the bot, role=%s", user_id, row[0])
+
+    return UserProfile(
+        user_id=user_id,
+        role=UserRole(row[0]),
+        language=row[1],
+        is_alive=row[2],
+        banned=row[3],
+    )
+
+
+@retry_on_primary
+async def get_banned_user_ids(conn: AsyncConnection) -> list[int]:
+    """Get ids of all the banned users."""
+
+    async with read_cursor(conn) as cursor:
+        data = await cursor.execute(
+            query="""
+                  SELECT user_id
+                  FROM users
+                  WHERE banned;
+                  """,
+        )
+        rows = await data.fetchall()
+
+    return [row[0] for row in rows]
+
+
+async def get_user_profile(
+    conn: AsyncConnection,
+    *,
+    user_id: int,
+) -> UserProfile | None:
+    """
+    Get the user's role, language, alive and banned statuses at once.
+    Always read from the primary, since the result goes to the profile cache.
+    """
 
     async with conn.cursor() as cursor:
         data = await cursor.execute(
             query="""
-                  SELECT id,
-                         user_id,
-                         username,
+                  SELECT role,
                          language,
-                         role,
                          is_alive,
-                         banned,
-                         created_at
+                         banned
                   FROM users
                   WHERE user_id = %s;
                   """,
             params=(user_id,),
         )
         row = await data.fetchone()
-        logger.info("Row is %s", row)
 
-        return row if row else None
+    if row is None:
+        logger.debug(
+            "No user with `user_id`=%s found in the database",
+            user_id
+        )
+        return None
+
+    return UserProfile(
+        user_id=user_id,
+        role=UserRole(row[0]),
+        language=row[1],
+        is_alive=row[2],
+        banned=row[3],
+    )
 
 
 async def change_user_alive_status(
@@ -129,246 +212,365 @@ async def change_user_banned_status_by_username(
     *,
     banned: bool,
     username: str,
-) -> None:
-    """Change the user's banned status by username."""
+) -> list[int]:
+    """
+    Change the user's banned status by username and return ids of
+    the updated users.
+    """
 
     async with conn.cursor() as cursor:
-        await cursor.execute(
+        data = await cursor.execute(
             query="""
                   UPDATE users
                   SET banned = %s
                   WHERE username = %s
+                  RETURNING user_id
                   """,
             params=(banned, username)
         )
+        rows = await data.fetchall()
     logger.info("Updated `banned` status to `%s` for username %s",
                 banned, username)
 
+    return [row[0] for row in rows]
 
-async def update_user_lang(
+
+async def set_alive_many(
     conn: AsyncConnection,
     *,
-    language: str,
-    user_id: int,
-) -> None:
-    """Update the user's language."""
+    is_alive: bool,
+    user_ids: list[int],
+) -> list[int]:
+    """
+    Set the alive status of many users with one query and return ids of
+    the users whose status was changed.
+    """
+
+    if not user_ids:
+        return []
 
     async with conn.cursor() as cursor:
-        await cursor.execute(
+        data = await cursor.execute(
             query="""
                   UPDATE users
-                  SET language = %s
-                  WHERE user_id = %s
+                  SET is_alive = %s
+                  WHERE user_id = ANY(%s)
+                    AND is_alive <> %s
+                  RETURNING user_id;
                   """,
-            params=(language, user_id)
+            params=(is_alive, user_ids, is_alive),
         )
-    logger.info("The language `%s` is set for the user `%s`", language, user_id)
+        rows = await data.fetchall()
+    logger.info("Updated `is_alive` status to `%s` for %d users",
+                is_alive, len(rows))
 
+    return [row[0] for row in rows]
 
-async def get_user_lang(
-    conn: AsyncConnection,
+
+async def set_banned_from_list(
+    conn: LazyConnection,
     *,
-    user_id: int,
-) -> str | None:
-    """Get the user's language from the database."""
+    banned: bool,
+    user_ids: list[int],
+    usernames: list[str],
+) -> tuple[int, list[int]]:
+    """
+    Set the banned status of all the users listed by id or username.
+
+    The list is streamed with COPY into a temporary table and applied with
+    one set-based UPDATE. Return the number of listed users found in
+    the database and ids of the users whose status was changed.
+    """
+
+    async with conn.transaction():
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                query="""
+                      CREATE TEMPORARY TABLE ban_targets
+                      (
+                          user_id  BIGINT,
+                          username VARCHAR(50)
+                      ) ON COMMIT DROP;
+                      """,
+                prepare=False,
+            )
+            async with cursor.copy(
+                "COPY ban_targets (user_id, username) FROM STDIN"
+            ) as copy:
+                for user_id in user_ids:
+                    await copy.write_row((user_id, None))
+                for username in usernames:
+                    await copy.write_row((None, username))
+
+            data = await cursor.execute(
+                query="""
+                      WITH targets AS (
+                          SELECT user_id, banned
+                          FROM users
+                          WHERE user_id IN (SELECT user_id FROM ban_targets)
+                             OR username IN (SELECT username FROM ban_targets)
+                      ),
+                      updated AS (
+                          UPDATE users
+                          SET banned = %(banned)s
+                          FROM targets
+                          WHERE users.user_id = targets.user_id
+                            AND targets.banned <> %(banned)s
+                          RETURNING users.user_id
+                      )
+                      SELECT (SELECT count(*) FROM targets),
+                             ARRAY(SELECT user_id FROM updated);
+                      """,
+                params={"banned": banned},
+                prepare=False,
+            )
+            found, updated = await data.fetchone()
 
-    async with conn.cursor() as cursor:
-        await cursor.execute(
-            query="""
-                  SELECT language
-                  FROM users
-                  WHERE user_id = %s;
-            """,
-            params=(user_id,),
-        )
-        row = await cursor.fetchone()
+    logger.info(
+        "Updated `banned` status to `%s` for %d of %d listed users",
+        banned, len(updated), len(user_ids) + len(usernames)
+    )
 
-        if row:
-            logger.info(
-                "The user with `user_id`=%s has the language %s",
-                user_id,
-                row[0]
+    return found, updated
+
+
+async def switch_user_banned_status(
+    conn: AsyncConnection | LazyConnection,
+    *,
+    banned: bool,
+    user_id: int | None = None,
+    username: str | None = None,
+) -> tuple[bool | None, list[int]]:
+    """
+    Set the banned status of the user found by id or username.
+
+    The status lookup and the update are sent in pipeline mode, in one
+    round trip, and run in one transaction. Return the previous status
+    (`None` if there is no such user) and ids of the users whose status
+    was changed.
+    """
+
+    if (user_id is None) == (username is None):
+        raise ValueError("Exactly one of `user_id` and `username` is required")
+
+    column = "user_id" if user_id is not None else "username"
+    value = user_id if user_id is not None else username
+
+    async with conn.transaction(), conn.pipeline():
+        async with conn.cursor() as status_cursor, conn.cursor() as update_cursor:
+            await status_cursor.execute(
+                query=f"""
+                      SELECT banned
+                      FROM users
+                      WHERE {column} = %s;
+                      """,
+                params=(value,),
             )
-        else:
-            logger.warning(
-                "No user with `user_id`=%s found in the database",
-                user_id
+            await update_cursor.execute(
+                query=f"""
+                      UPDATE users
+                      SET banned = %s
+                      WHERE {column} = %s
+                        AND banned <> %s
+                      RETURNING user_id;
+                      """,
+                params=(banned, value, banned),
             )
+            row = await status_cursor.fetchone()
+            updated = await update_cursor.fetchall()
+
+    if updated:
+        logger.info("Updated `banned` status to `%s` for %s %s",
+                    banned, column, value)
 
-        return row[0] if row else None
+    return (row[0] if row else None), [user_row[0] for user_row in updated]
 
 
-async def get_user_alive_status(
+async def update_user_lang(
     conn: AsyncConnection,
     *,
+    language: str,
     user_id: int,
-) -> bool | None:
-    """Get the user's alive status."""
+) -> None:
+    """Update the user's language."""
 
     async with conn.cursor() as cursor:
-        data = await cursor.execute(
+        await cursor.execute(
             query="""
-                  SELECT is_alive
-                  FROM users
-                  WHERE user_id = %s;
+                  UPDATE users
+                  SET language = %s
+                  WHERE user_id = %s
                   """,
-            params=(user_id,),
+            params=(language, user_id)
         )
-        row = await data.fetchone()
+    logger.info("The language `%s` is set for the user `%s`", language, user_id)
 
-    if row:
-        logger.info(
-            "The user with `user_id`=%s has the is_alive status is %s",
-            user_id,
-            row[0]
-        )
-    else:
-        logger.warning(
-            "No user with `user_id`=%s found in the database",
-            user_id
-        )
 
-    return row[0] if row else None
+async def add_user_activity(
+    conn: AsyncConnection,
+    *,
+    user_id: int,
+) -> None:
+    """Add a user's activity value."""
+
+    await add_users_activity(
+        conn,
+        rows=[(user_id, datetime.now(timezone.utc).date(), 1)]
+    )
 
 
-async def get_user_banned_status_by_id(
+async def add_users_activity(
     conn: AsyncConnection,
     *,
-    user_id: int,
-) -> bool | None:
-    """Get the user's banned status by id."""
+    rows: list[tuple[int, date, int]],
+    drain_id: str | None = None,
+) -> bool:
+    """
+    Add accumulated actions of many users with one statement and keep
+    the `activity_totals` rollup in step with it.
+    Each row is `(user_id, activity_date, actions)`, rows of unknown users
+    are skipped.
+    With `drain_id` the rows are added only once: the id is recorded in
+    `activity_drains` in the same transaction, and `False` is returned
+    if it was recorded before.
+    """
+
+    if not rows:
+        return True
+
+    user_ids, activity_dates, actions = map(list, zip(*rows))
+
+    async with conn.transaction(), conn.cursor() as cursor:
+        if drain_id is not None:
+            await cursor.execute(
+                query="""
+                      INSERT INTO activity_drains (drain_id)
+                      VALUES (%s)
+                      ON CONFLICT (drain_id) DO NOTHING;
+                      """,
+                params=(drain_id,),
+            )
+            if not cursor.rowcount:
+                logger.warning("Activity drain `%s` was already written", drain_id)
+                return False
 
-    async with conn.cursor() as cursor:
-        data = await cursor.execute(
+        await cursor.execute(
             query="""
-                  SELECT banned
-                  FROM users
-                  WHERE user_id = %s;
-                  """,
-            params=(user_id,),
-        )
-        row = await data.fetchone()
-
-    if row:
-        logger.info(
-            "The user with `user_id`=%s has the banned status is %s",
-            user_id,
-            row[0]
-        )
-    else:
-        logger.warning(
-            "No user with `user_id`=%s found in the database",
-            user_id
+                  WITH new_activity AS (
+                      SELECT t.user_id, t.activity_date, t.actions
+                      FROM unnest(%s::bigint[], %s::date[], %s::int[])
+                               AS t(user_id, activity_date, actions)
+                      JOIN users USING (user_id)
+                  ),
+                  daily AS (
+                      INSERT INTO activity (user_id, activity_date, actions)
+                      SELECT user_id, activity_date, actions
+                      FROM new_activity
+                      ORDER BY user_id, activity_date
+                      ON CONFLICT (user_id, activity_date)
+                      DO UPDATE
+                      SET actions = activity.actions + EXCLUDED.actions
+                  )
+                  INSERT INTO activity_totals (user_id, total_actions)
+                  SELECT user_id, SUM(actions)
+                  FROM new_activity
+                  GROUP BY user_id
+                  ORDER BY user_id
+                  ON CONFLICT (user_id)
+                  DO UPDATE
+                  SET total_actions = activity_totals.total_actions
+                                      + EXCLUDED.total_actions;
+            """,
+            params=(user_ids, activity_dates, actions),
         )
-
-    return row[0] if row else None
+    logger.info(
+        "Users activity flushed. table=`activity`, rows=%d",
+        len(rows)
+    )
+    return True
 
 
-async def get_user_banned_status_by_username(
+async def delete_activity_drain(
     conn: AsyncConnection,
     *,
-    username: str,
-) -> bool | None:
-    """Get the user's banned status by username."""
+    drain_id: str,
+) -> None:
+    """Forget a drain which is no longer kept in Redis."""
 
     async with conn.cursor() as cursor:
-        data = await cursor.execute(
+        await cursor.execute(
             query="""
-                  SELECT banned
-                  FROM users
-                  WHERE username = %s;
+                  DELETE FROM activity_drains
+                  WHERE drain_id = %s;
                   """,
-            params=(username,),
-        )
-        row = await data.fetchone()
-
-    if row:
-        logger.info(
-            "The user with `username`=%s has the banned status is %s",
-            username,
-            row[0]
+            params=(drain_id,),
         )
-    else:
-        logger.warning(
-            "No user with `username`=%s found in the database",
-            username
-        )
-
-    return row[0] if row else None
 
 
-async def get_user_role(
-    conn: AsyncConnection,
-    *,
-    user_id: int,
-) -> UserRole | None:
-    """Get the user's role."""
+@retry_on_primary
+async def get_statistics(conn: AsyncConnection) -> list[Any] | None:
+    """Get the user's statistics."""
 
-    async with conn.cursor() as cursor:
+    async with read_cursor(conn) as cursor:
         data = await cursor.execute(
             query="""
-                  SELECT role
-                  FROM users
-                  WHERE user_id = %s;
-                  """,
-            params=(user_id,),
+                  SELECT user_id, total_actions
+                  FROM activity_totals
+                  ORDER BY total_actions DESC
+                  LIMIT 5;
+            """,
         )
-        row = await data.fetchone()
+        rows = await data.fetchall()
 
-    if row:
-        logger.info(
-            "The user with `user_id`=%s has the role is %s",
-            user_id,
-            row[0]
-        )
-    else:
-        logger.warning(
-            "No user with `user_id`=%s found in the database",
-            user_id
-        )
+    logger.info("Users activity got from table=`activity_totals`")
 
-    return UserRole(row[0]) if row else None
+    return [*rows] if rows else None
 
 
-async def add_user_activity(
+async def iter_activity_totals(
     conn: AsyncConnection,
     *,
-    user_id: int,
-) -> None:
-    """Add a user's activity value."""
-
-    async with conn.cursor() as cursor:
+    batch_size: int = 10_000,
+) -> AsyncIterator[list[tuple[int, int]]]:
+    """
+    Yield `(user_id, total_actions)` rows of all the users in batches,
+    streaming them with a server-side cursor.
+    """
+
+    async with conn.cursor(name="activity_totals_cursor") as cursor:
         await cursor.execute(
             query="""
-                  INSERT INTO activity (user_id)
-                  VALUES (%s)
-                  ON CONFLICT (user_id, activity_date)
-                  DO UPDATE
-                  SET actions = activity.actions + 1;
+                  SELECT user_id, total_actions
+                  FROM activity_totals;
             """,
-            params=(user_id,),
         )
-    logger.info(
-        "User activity updated. table=`activity`, user_id=%d",
-        user_id
-    )
+        while rows := await cursor.fetchmany(batch_size):
+            yield rows
 
 
-async def get_statistics(conn: AsyncConnection) -> list[Any] | None:
-    """Get the user's statistics."""
+async def get_alive_user_ids(
+    conn: AsyncConnection,
+    *,
+    after_id: int = 0,
+    limit: int = 500,
+) -> list[int]:
+    """
+    Return up to `limit` ids of the users with `is_alive = TRUE` greater
+    than `after_id` in ascending order.
+    """
 
     async with conn.cursor() as cursor:
         data = await cursor.execute(
             query="""
-                  SELECT user_id, SUM(actions) AS total_actions
-                  FROM activity
-                  GROUP BY user_id
-                  ORDER BY total_actions DESC
-                  LIMIT 5;
+                  SELECT user_id
+                  FROM users
+                  WHERE is_alive = TRUE
+                    AND user_id > %s
+                  ORDER BY user_id
+                  LIMIT %s;
             """,
+            params=(after_id, limit),
         )
         rows = await data.fetchall()
 
-    logger.info("Users activity got from table=`activity`")
-
-    return [*rows] if rows else None
+    return [row[0] for row in rows]
@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+
+from app.bot.enums.roles import UserRole
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    """The user's fields needed by middlewares, filters and handlers."""
+
+    user_id: int
+    role: UserRole
+    language: str
+    is_alive: bool
+    banned: bool
+
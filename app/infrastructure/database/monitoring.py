@@ -0,0 +1,111 @@
+import asyncio
+import logging
+
+from contextlib import suppress
+
+from psycopg_pool import AsyncConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMonitor:
+    """
+    Periodically log connection pool statistics and, in adaptive mode,
+    grow the pool while requests keep queueing for a connection and shrink
+    it back once the queue stays empty.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        interval: float = 60.0,
+        adaptive: bool = False,
+        adaptive_max_size: int = 10,
+        grow_after: int = 3,
+        shrink_after: int = 10,
+    ) -> None:
+        self.pool = pool
+        self.interval = interval
+        self.adaptive = adaptive
+        self.base_max_size = pool.max_size
+        self.adaptive_max_size = max(adaptive_max_size, pool.max_size)
+        self.grow_after = grow_after
+        self.shrink_after = shrink_after
+        self._busy_intervals = 0
+        self._idle_intervals = 0
+        self._worker: asyncio.Task | None = None
+
+    def report(self) -> dict[str, int]:
+        """Log the statistics collected since the previous report."""
+
+        stats = self.pool.pop_stats()
+        requests = stats.get('requests_num', 0)
+        wait_ms = stats.get('requests_wait_ms', 0)
+
+        logger.info(
+            "Postgres pool: size=%d/%d, available=%d, waiting=%d, "
+            "requests=%d, queued=%d, avg_checkout_ms=%.1f, usage_ms=%d, "
+            "timeouts=%d, connections_lost=%d",
+            stats.get('pool_size', 0),
+            stats.get('pool_max', 0),
+            stats.get('pool_available', 0),
+            stats.get('requests_waiting', 0),
+            requests,
+            stats.get('requests_queued', 0),
+            wait_ms / requests if requests else 0.0,
+            stats.get('usage_ms', 0),
+            stats.get('requests_errors', 0),
+            stats.get('connections_lost', 0),
+        )
+
+        return stats
+
+    async def adapt(self, stats: dict[str, int]) -> None:
+        """Resize the pool according to queueing in the last interval."""
+
+        queued = stats.get('requests_queued', 0) + stats.get('requests_waiting', 0)
+
+        if queued:
+            self._busy_intervals += 1
+            self._idle_intervals = 0
+        else:
+            self._idle_intervals += 1
+            self._busy_intervals = 0
+
+        max_size = self.pool.max_size
+
+        if self._busy_intervals >= self.grow_after and max_size < self.adaptive_max_size:
+            await self.pool.resize(self.pool.min_size, max_size + 1)
+            self._busy_intervals = 0
+            logger.warning(
+                'Postgres pool is starving, max_size raised to %d', max_size + 1
+            )
+        elif self._idle_intervals >= self.shrink_after and max_size > self.base_max_size:
+            await self.pool.resize(self.pool.min_size, max_size - 1)
+            self._idle_intervals = 0
+            logger.info('Postgres pool is idle, max_size lowered to %d', max_size - 1)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                stats = self.report()
+                if self.adaptive:
+                    await self.adapt(stats)
+            except Exception as e:
+                logger.exception('Failed to collect Postgres pool stats: %s', e)
+
+    async def start(self) -> None:
+        """Start periodic monitoring."""
+
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic monitoring."""
+
+        if self._worker is not None:
+            self._worker.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
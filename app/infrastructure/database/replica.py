@@ -0,0 +1,97 @@
+import asyncio
+import logging
+
+from contextlib import suppress
+
+from psycopg import Error
+from psycopg_pool import AsyncConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRouter:
+    """
+    Keep track of whether a read replica may serve queries.
+
+    The replication lag is checked every `check_interval` seconds, and
+    the replica is taken out of rotation while the lag exceeds `max_lag`
+    seconds or after a failed query, until the next successful check.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        max_lag: float = 1.0,
+        check_interval: float = 5.0,
+        checkout_timeout: float = 1.0,
+    ) -> None:
+        self.pool = pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.checkout_timeout = checkout_timeout
+        self.available = False
+        self.lag: float | None = None
+        self._worker: asyncio.Task | None = None
+
+    def mark_unavailable(self, reason: Exception) -> None:
+        """Send reads to the primary until the next successful check."""
+
+        if self.available:
+            logger.warning('Read replica is out of rotation: %s', reason)
+        self.available = False
+
+    async def check(self) -> None:
+        """Measure the replication lag and update availability."""
+
+        try:
+            async with self.pool.connection(timeout=self.checkout_timeout) as conn:
+                async with conn.cursor() as cursor:
+                    data = await cursor.execute(
+                        query="""
+                              SELECT CASE
+                                  WHEN NOT pg_is_in_recovery()
+                                      OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+                                  THEN 0
+                                  ELSE EXTRACT(
+                                      EPOCH FROM now() - pg_last_xact_replay_timestamp()
+                                  )
+                              END;
+                              """,
+                    )
+                    row = await data.fetchone()
+        except Exception as e:
+            self.lag = None
+            self.mark_unavailable(e)
+            return
+
+        self.lag = float(row[0] or 0)
+        if self.lag > self.max_lag:
+            self.mark_unavailable(
+                RuntimeError(f'replication lag {self.lag:.2f}s > {self.max_lag}s')
+            )
+        elif not self.available:
+            logger.info('Read replica is in rotation, lag=%.2fs', self.lag)
+            self.available = True
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self) -> None:
+        """Start periodic lag checks."""
+
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic lag checks and close the replica pool."""
+
+        if self._worker is not None:
+            self._worker.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
+
+        with suppress(Error):
+            await self.pool.close()
@@ -0,0 +1,81 @@
+import json
+
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.storage.base import KeyBuilder, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio import Redis
+from redis.typing import ExpiryT
+
+
+def _json_dumps(data: Mapping[str, Any]) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def get_serializer(
+    name: str,
+) -> tuple[Callable[[Mapping[str, Any]], bytes], Callable[[bytes], dict[str, Any]]]:
+    """
+    Return `(dumps, loads)` functions of the serializer: `json` (compact
+    UTF-8 JSON) or `msgpack`.
+    """
+
+    if name == 'json':
+        return _json_dumps, json.loads
+    if name == 'msgpack':
+        import msgpack
+
+        return msgpack.packb, msgpack.unpackb
+
+    raise ValueError(f'Unknown FSM serializer: {name}')
+
+
+class CompactRedisStorage(RedisStorage):
+    """
+    Redis FSM storage that keeps data in a compact binary form.
+
+    Data written before the serializer was switched is still readable: JSON
+    objects always start with `{`, which never starts a msgpack map.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        key_builder: KeyBuilder | None = None,
+        state_ttl: ExpiryT | None = None,
+        data_ttl: ExpiryT | None = None,
+        serializer: str = 'json',
+    ) -> None:
+        super().__init__(
+            redis=redis,
+            key_builder=key_builder,
+            state_ttl=state_ttl,
+            data_ttl=data_ttl,
+        )
+        self.serializer = serializer
+        self._dumps, self._loads = get_serializer(serializer)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f'Data must be a dict or dict-like object, got {type(data).__name__}'
+            )
+
+        redis_key = self.key_builder.build(key, 'data')
+        if not data:
+            await self.redis.delete(redis_key)
+            return
+        await self.redis.set(redis_key, self._dumps(data), ex=self.data_ttl)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        redis_key = self.key_builder.build(key, 'data')
+        value = await self.redis.get(redis_key)
+        if value is None:
+            return {}
+        if isinstance(value, str):
+            value = value.encode()
+        if value[:1] == b'{':
+            return json.loads(value)
+        return self._loads(value)
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Any
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+_NOT_LOADED: Any = object()
+
+
+@dataclass(slots=True)
+class _Entry:
+    state: str | None = _NOT_LOADED
+    data: dict[str, Any] = _NOT_LOADED
+    state_dirty: bool = False
+    data_dirty: bool = False
+
+    @property
+    def dirty(self) -> bool:
+        return self.state_dirty or self.data_dirty
+
+
+class TieredStorage(BaseStorage):
+    """
+    FSM storage that keeps the state and data of recently active users in
+    a bounded in-process LRU in front of another storage (usually Redis).
+
+    Reads are served from memory and fall back to the backend on a miss.
+    Writes go to memory and are written behind to the backend every
+    `flush_interval` seconds and on close. Entries with unwritten changes
+    are never evicted, so the LRU may grow past `max_size` while the
+    backend is unavailable or many users write within one interval.
+
+    The backend is not re-read while an entry is in memory, so this storage
+    is only correct when a single bot process handles all the updates.
+    """
+
+    def __init__(
+        self,
+        backend: BaseStorage,
+        max_size: int = 10_000,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.backend = backend
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._entries: OrderedDict[StorageKey, _Entry] = OrderedDict()
+        self._dirty: set[StorageKey] = set()
+        self._worker: asyncio.Task | None = None
+
+    def _entry(self, key: StorageKey) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._evict()
+            entry = self._entries[key] = _Entry()
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _evict(self) -> None:
+        # Make room for one more entry
+        excess = len(self._entries) + 1 - self.max_size
+        if excess <= 0:
+            return
+
+        evicted = []
+        for key, entry in self._entries.items():
+            if not entry.dirty:
+                evicted.append(key)
+                if len(evicted) == excess:
+                    break
+        for key in evicted:
+            del self._entries[key]
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = self._entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        entry.state_dirty = True
+        self._dirty.add(key)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        entry = self._entry(key)
+        if entry.state is _NOT_LOADED:
+            state = await self.backend.get_state(key)
+            # `set_state` may have been called while the backend was read
+            if entry.state is _NOT_LOADED:
+                entry.state = state
+        return entry.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f'Data must be a dict or dict-like object, got {type(data).__name__}'
+            )
+
+        entry = self._entry(key)
+        entry.data = data.copy()
+        entry.data_dirty = True
+        self._dirty.add(key)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        entry = self._entry(key)
+        if entry.data is _NOT_LOADED:
+            data = await self.backend.get_data(key)
+            # `set_data` may have been called while the backend was read
+            if entry.data is _NOT_LOADED:
+                entry.data = data
+        return entry.data.copy()
+
+    async def flush(self) -> None:
+        """Write all the changes kept in memory to the backend."""
+
+        dirty, self._dirty = self._dirty, set()
+
+        for key in dirty:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+
+            state_dirty, data_dirty = entry.state_dirty, entry.data_dirty
+            entry.state_dirty = entry.data_dirty = False
+            try:
+                if state_dirty:
+                    await self.backend.set_state(key, entry.state)
+                if data_dirty:
+                    await self.backend.set_data(key, entry.data)
+            except Exception as e:
+                logger.error('Failed to write FSM changes of %s: %s', key, e)
+                entry.state_dirty |= state_dirty
+                entry.data_dirty |= data_dirty
+                self._dirty.add(key)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception('Unexpected error while flushing FSM storage: %s', e)
+
+    async def start(self) -> None:
+        """Start periodic write-behind."""
+
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop write-behind, write what is left and close the backend."""
+
+        if self._worker is not None:
+            self._worker.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
+
+        await self.flush()
+        logger.info('FSM storage flushed, %d entries were kept in memory',
+                    len(self._entries))
+        await self.backend.close()
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import logging
+import time
+
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError
+from psycopg import Error
+from psycopg_pool import AsyncConnectionPool
+from redis.asyncio import Redis
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError, RedisError
+
+from app.infrastructure.cache.shared import SharedProfileCache
+from app.infrastructure.database.db import get_alive_user_ids, set_alive_many
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BroadcastState:
+    admin_id: int
+    from_chat_id: int
+    message_id: int
+    language: str | None = None
+    last_user_id: int = 0
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+
+
+class Broadcaster:
+    """
+    Copies a message to every user with `is_alive = TRUE`.
+
+    Recipients are read from the database in batches of `batch_size` ids,
+    paginated by user id, so memory use stays flat and no connection or
+    transaction is held while messages are sent. Every batch is sent by
+    `workers` concurrent workers at no more than `rate` messages per
+    second. Users who blocked the bot are marked as not alive once per batch.
+
+    The progress is checkpointed in Redis after every batch, and the
+    broadcast is resumed from the checkpoint by whichever bot instance
+    takes the lock first, so at most one batch is sent twice after a crash.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        redis: Redis,
+        db_pool: AsyncConnectionPool,
+        profile_cache: SharedProfileCache,
+        translations: dict,
+        workers: int = 10,
+        rate: float = 20.0,
+        batch_size: int = 500,
+        check_interval: float = 30.0,
+        key_prefix: str = 'broadcast',
+    ) -> None:
+        self.bot = bot
+        self.redis = redis
+        self.db_pool = db_pool
+        self.profile_cache = profile_cache
+        self.translations = translations
+        self.workers = workers
+        self.send_interval = 1 / rate
+        self.batch_size = batch_size
+        self.check_interval = check_interval
+        self._state_key = f'{key_prefix}:state'
+        self._lock_key = f'{key_prefix}:lock'
+        self._next_send = 0.0
+        self._task: asyncio.Task | None = None
+        self._worker: asyncio.Task | None = None
+
+    async def status(self) -> BroadcastState | None:
+        """Return the state of the current broadcast, if there is one."""
+
+        raw = await self.redis.get(self._state_key)
+        return BroadcastState(**json.loads(raw)) if raw else None
+
+    async def begin(
+        self,
+        *,
+        admin_id: int,
+        from_chat_id: int,
+        message_id: int,
+        language: str | None = None,
+    ) -> bool:
+        """
+        Start broadcasting a copy of the message. Return `False` if another
+        broadcast is in progress.
+        """
+
+        state = BroadcastState(
+            admin_id=admin_id,
+            from_chat_id=from_chat_id,
+            message_id=message_id,
+            language=language,
+        )
+        if not await self.redis.set(self._state_key, json.dumps(asdict(state)), nx=True):
+            return False
+
+        logger.info('Broadcast of message %d from chat %d started by %d',
+                    message_id, from_chat_id, admin_id)
+        await self.resume()
+        return True
+
+    async def cancel(self) -> BroadcastState | None:
+        """
+        Cancel the current broadcast on every instance and return its state.
+        The instance running it stops after the current batch.
+        """
+
+        state = await self.status()
+        if state is not None:
+            await self.redis.delete(self._state_key)
+            logger.info('Broadcast cancelled after %d messages', state.sent)
+        return state
+
+    async def resume(self) -> None:
+        """Continue the current broadcast, unless another instance runs it."""
+
+        if self._task is not None and not self._task.done():
+            return
+        if not await self.redis.exists(self._state_key):
+            return
+
+        lock = self.redis.lock(self._lock_key, timeout=300, blocking=False)
+        if await lock.acquire():
+            self._task = asyncio.create_task(self._broadcast(lock))
+
+    async def _checkpoint(self, state: BroadcastState) -> bool:
+        # `xx` keeps a cancelled broadcast from being recreated
+        return bool(
+            await self.redis.set(self._state_key, json.dumps(asdict(state)), xx=True)
+        )
+
+    async def _send(self, state: BroadcastState, user_id: int) -> bool:
+        """Send a copy to the user, return `False` if the user blocked the bot."""
+
+        now = time.monotonic()
+        slot = max(now, self._next_send)
+        self._next_send = slot + self.send_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+        try:
+            await self.bot.copy_message(
+                chat_id=user_id,
+                from_chat_id=state.from_chat_id,
+                message_id=state.message_id
+            )
+        except TelegramForbiddenError:
+            state.blocked += 1
+            return False
+        except TelegramAPIError as e:
+            logger.debug('Failed to broadcast to user %d: %s', user_id, e)
+            state.failed += 1
+        else:
+            state.sent += 1
+        return True
+
+    async def _send_batch(self, state: BroadcastState, user_ids: list[int]) -> None:
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for user_id in user_ids:
+            queue.put_nowait(user_id)
+        blocked: list[int] = []
+
+        async def worker() -> None:
+            while not queue.empty():
+                user_id = queue.get_nowait()
+                if not await self._send(state, user_id):
+                    blocked.append(user_id)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(user_ids)))))
+
+        if blocked:
+            async with self.db_pool.connection() as conn:
+                changed = await set_alive_many(conn, is_alive=False, user_ids=blocked)
+            await self.profile_cache.invalidate(*changed)
+
+    async def _broadcast(self, lock: Lock) -> None:
+        try:
+            state = await self.status()
+            if state is None:
+                return
+            logger.info('Broadcasting to users after id %d', state.last_user_id)
+
+            while True:
+                # The connection is released before the batch is sent
+                async with self.db_pool.connection() as conn:
+                    user_ids = await get_alive_user_ids(
+                        conn,
+                        after_id=state.last_user_id,
+                        limit=self.batch_size
+                    )
+                if not user_ids:
+                    break
+
+                await self._send_batch(state, user_ids)
+                state.last_user_id = user_ids[-1]
+
+                if not await self._checkpoint(state):
+                    return
+                await lock.reacquire()
+
+            await self.redis.delete(self._state_key)
+            logger.info('Broadcast finished: sent=%d, blocked=%d, failed=%d',
+                        state.sent, state.blocked, state.failed)
+            await self._report(state)
+        except LockError:
+            logger.error('Broadcast lock is lost, leaving the broadcast to another instance')
+        except (Error, RedisError) as e:
+            logger.error('Broadcast interrupted, will be resumed: %s', e)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception('Unexpected error while broadcasting: %s', e)
+        finally:
+            with suppress(LockError, RedisError):
+                await lock.release()
+
+    async def _report(self, state: BroadcastState) -> None:
+        i18n: dict = self.translations.get(state.language) or self.translations[
+            self.translations['default']
+        ]
+        try:
+            await self.bot.send_message(
+                chat_id=state.admin_id,
+                text=i18n.get('broadcast_finished').format(
+                    state.sent, state.blocked, state.failed
+                )
+            )
+        except TelegramAPIError as e:
+            logger.error('Failed to report broadcast results: %s', e)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.resume()
+            except Exception as e:
+                logger.exception('Unexpected error while resuming broadcast: %s', e)
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self) -> None:
+        """Resume an unfinished broadcast and keep checking for abandoned ones."""
+
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop broadcasting, the broadcast is resumed from the last checkpoint."""
+
+        for task in (self._worker, self._task):
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        self._worker = self._task = None
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import logging
+
+from collections.abc import Sequence
+
+from aiogram import Bot
+from aiogram.enums import BotCommandScopeType
+from aiogram.types import BotCommand, BotCommandScopeChat
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class ChatMenus:
+    """
+    Pushes menu commands to private chats, skipping the API call when the
+    chat already has exactly the same commands.
+
+    A fingerprint of the commands last pushed to every chat is kept in
+    Redis. It is computed from the commands themselves, so it changes with
+    the user's role and language as well as with the command list after
+    a deploy, and the menu is refreshed in all these cases.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        key_prefix: str = 'menu',
+        ttl: int = 30 * 24 * 60 * 60,
+    ) -> None:
+        self.redis = redis
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+
+    def _key(self, chat_id: int) -> str:
+        return f'{self.key_prefix}:{chat_id}'
+
+    @staticmethod
+    def fingerprint(commands: Sequence[BotCommand]) -> str:
+        payload = json.dumps(
+            [(command.command, command.description) for command in commands],
+            ensure_ascii=False
+        )
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    async def set_commands(
+        self,
+        bot: Bot,
+        *,
+        chat_id: int,
+        commands: Sequence[BotCommand],
+    ) -> bool:
+        """
+        Set menu commands of the chat unless it already has them. Return
+        `True` if the commands were pushed to Telegram.
+        """
+
+        fingerprint = self.fingerprint(commands)
+        key = self._key(chat_id)
+
+        try:
+            if await self.redis.get(key) == fingerprint.encode():
+                return False
+        except RedisError as e:
+            logger.error('Failed to get menu fingerprint of chat %d: %s', chat_id, e)
+
+        await bot.set_my_commands(
+            commands=list(commands),
+            scope=BotCommandScopeChat(
+                type=BotCommandScopeType.CHAT,
+                chat_id=chat_id
+            )
+        )
+
+        try:
+            await self.redis.set(key, fingerprint, ex=self.ttl)
+        except RedisError as e:
+            logger.error('Failed to save menu fingerprint of chat %d: %s', chat_id, e)
+
+        return True
@@ -0,0 +1,192 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from contextlib import suppress
+from enum import IntEnum
+from typing import TYPE_CHECKING
+
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import CopyMessage, GetUpdates, Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+logger = logging.getLogger(__name__)
+
+
+class SendPriority(IntEnum):
+    ADMIN = 0
+    DEFAULT = 1
+    ECHO = 2
+
+
+class OutboundRateLimiter(BaseRequestMiddleware):
+    """
+    Bot session middleware that queues outgoing API requests to stay under
+    Telegram flood limits.
+
+    Every request waits for a slot of the global budget (`global_rate`
+    requests per second) and for its chat's own budget (`per_chat_rate`).
+    Waiting requests are released by priority: replies to admins first,
+    echo copies last. A `retry_after` answer pauses the whole queue for
+    the requested time, and the request is retried up to `max_retries`.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        per_chat_rate: float = 1.0,
+        max_retries: int = 3,
+        admin_ids: list[int] | None = None,
+        stats_interval: float = 60.0,
+    ) -> None:
+        self.global_interval = 1 / global_rate
+        self.per_chat_interval = 1 / per_chat_rate
+        self.max_retries = max_retries
+        self.admin_ids = frozenset(admin_ids or ())
+        self.stats_interval = stats_interval
+
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._queued = asyncio.Event()
+        self._chat_next: dict[int | str, float] = {}
+        self._paused_until = 0.0
+        self._worker: asyncio.Task | None = None
+        self._reporter: asyncio.Task | None = None
+
+        self.sent = 0
+        self.retried = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of requests waiting for the global budget."""
+
+        return len(self._queue)
+
+    def _priority(self, method: TelegramMethod, chat_id: int | str | None) -> SendPriority:
+        if chat_id in self.admin_ids:
+            return SendPriority.ADMIN
+        if isinstance(method, CopyMessage):
+            return SendPriority.ECHO
+        return SendPriority.DEFAULT
+
+    async def _wait_for_chat(self, chat_id: int | str) -> None:
+        now = time.monotonic()
+        slot = max(now, self._chat_next.get(chat_id, now))
+        self._chat_next[chat_id] = slot + self.per_chat_interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _wait_for_global(self, priority: SendPriority) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._counter), future))
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._queued.set()
+        await future
+
+    async def acquire(self, method: TelegramMethod, chat_id: int | str | None) -> None:
+        """Wait until the request may be sent."""
+
+        if chat_id is not None:
+            await self._wait_for_chat(chat_id)
+        await self._wait_for_global(self._priority(method, chat_id))
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: 'Bot',
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if isinstance(method, GetUpdates) or self._worker is None:
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, 'chat_id', None)
+
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(method, chat_id)
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retried += 1
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + e.retry_after
+                )
+                logger.warning(
+                    'Flood control on %s, pausing sends for %d s',
+                    type(method).__name__, e.retry_after
+                )
+                continue
+
+            self.sent += 1
+            return response
+
+    async def _release(self) -> None:
+        while True:
+            if not self._queue:
+                self._queued.clear()
+                await self._queued.wait()
+                continue
+
+            delay = self._paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                future.set_result(None)
+                await asyncio.sleep(self.global_interval)
+
+    def log_stats(self) -> None:
+        """Log queue depth and request counters."""
+
+        logger.info(
+            'Outbound queue: depth=%d, max_depth=%d, sent=%d, retried=%d',
+            self.depth, self.max_depth, self.sent, self.retried
+        )
+        self.max_depth = self.depth
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            self.log_stats()
+
+            # Forget chats whose budget is fully restored
+            now = time.monotonic()
+            self._chat_next = {
+                chat_id: slot for chat_id, slot in self._chat_next.items()
+                if slot > now
+            }
+
+    async def start(self) -> None:
+        """Start releasing queued requests."""
+
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._release())
+            self._reporter = asyncio.create_task(self._report())
+
+    async def stop(self) -> None:
+        """Stop the queue, requests made afterwards are sent directly."""
+
+        for task in (self._worker, self._reporter):
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        self._worker = self._reporter = None
+
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                future.set_result(None)
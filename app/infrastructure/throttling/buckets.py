@@ -0,0 +1,94 @@
+import logging
+import time
+
+from collections import OrderedDict
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Rate limits as `{update_type: (tokens per second, bucket size)}`,
+# the `default` entry applies to update types not listed explicitly.
+Rates = dict[str, tuple[float, int]]
+
+
+class MemoryTokenBuckets:
+    """Per-process token buckets, one per user and update type."""
+
+    def __init__(self, rates: Rates, max_size: int = 100_000) -> None:
+        if 'default' not in rates:
+            raise ValueError('Rates must contain the `default` entry')
+
+        self.rates = rates
+        self.max_size = max_size
+        self._buckets: OrderedDict[tuple[int, str], tuple[float, float]] = OrderedDict()
+
+    async def consume(self, user_id: int, update_type: str) -> bool:
+        """Take a token from the user's bucket, return `False` if it is empty."""
+
+        rate, burst = self.rates.get(update_type, self.rates['default'])
+        key = (user_id, update_type)
+        now = time.monotonic()
+
+        tokens, updated_at = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        # Buckets of the least recently active users are most likely full
+        while len(self._buckets) > self.max_size:
+            self._buckets.popitem(last=False)
+
+        return allowed
+
+
+class RedisTokenBuckets:
+    """Token buckets shared by all the bot instances, kept in Redis hashes."""
+
+    SCRIPT = """
+        local rate = tonumber(ARGV[1])
+        local burst = tonumber(ARGV[2])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        local tokens = tonumber(bucket[1]) or burst
+        local ts = tonumber(bucket[2]) or now
+        tokens = math.min(burst, tokens + (now - ts) * rate)
+
+        local allowed = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+            allowed = 1
+        end
+
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+        redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+        return allowed
+    """
+
+    def __init__(self, redis: Redis, rates: Rates, key_prefix: str = 'throttle') -> None:
+        if 'default' not in rates:
+            raise ValueError('Rates must contain the `default` entry')
+
+        self.rates = rates
+        self.key_prefix = key_prefix
+        self._script = redis.register_script(self.SCRIPT)
+
+    async def consume(self, user_id: int, update_type: str) -> bool:
+        """Take a token from the user's bucket, return `False` if it is empty."""
+
+        rate, burst = self.rates.get(update_type, self.rates['default'])
+        key = f'{self.key_prefix}:{update_type}:{user_id}'
+
+        try:
+            return bool(await self._script(keys=[key], args=[rate, burst]))
+        except RedisError as e:
+            # Do not stop the bot because of the limiter
+            logger.error('Failed to check throttling for user %d: %s', user_id, e)
+            return True
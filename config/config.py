@@ -1,3 +1,4 @@
+import importlib.util
 import logging
 import os
 import sys
@@ -15,6 +16,18 @@ class BotConfig:
     admin_ids: list[int]
 
 
+@dataclass
+class WebhookConfig:
+    enabled: bool
+    url: str
+    path: str
+    secret: str
+    host: str
+    port: int
+    workers: int
+    max_connections: int
+
+
 @dataclass
 class DatabaseConfig:
     name: str
@@ -22,6 +35,21 @@ class DatabaseConfig:
     port: int
     user: str
     password: str
+    pool_min_size: int = 1
+    pool_max_size: int = 3
+    pool_timeout: float = 10.0
+    pool_max_waiting: int = 0
+    pool_max_lifetime: float = 3600.0
+    pool_max_idle: float = 600.0
+    pool_reconnect_timeout: float = 300.0
+    pool_stats_interval: float = 60.0
+    pool_adaptive: bool = False
+    pool_adaptive_max_size: int = 10
+    prepare_threshold: int | None = 0
+    replica_host: str | None = None
+    replica_port: int | None = None
+    replica_max_lag: float = 1.0
+    replica_check_interval: float = 5.0
 
 
 @dataclass
@@ -31,6 +59,63 @@ class RedisConfig:
     db: int
     password: str
     username: str
+    max_connections: int = 50
+    pool_timeout: float = 5.0
+
+
+@dataclass
+class FSMConfig:
+    serializer: str
+    key_prefix: str
+    state_ttl: int | None
+    data_ttl: int | None
+    memory_tier: bool = False
+    memory_max_size: int = 10_000
+    memory_flush_interval: float = 1.0
+
+
+@dataclass
+class CacheConfig:
+    profile_max_size: int
+    profile_ttl: float
+    profile_redis_ttl: int
+
+
+@dataclass
+class ActivityConfig:
+    backend: str
+    flush_interval: float
+    max_pending: int
+    leaderboard: bool
+    leaderboard_reconcile_interval: float
+
+
+@dataclass
+class ThrottlingConfig:
+    enabled: bool
+    backend: str
+    rates: dict[str, tuple[float, int]]
+    warn: bool
+
+
+@dataclass
+class OutboundConfig:
+    global_rate: float
+    per_chat_rate: float
+    max_retries: int
+
+
+@dataclass
+class BroadcastConfig:
+    workers: int
+    rate: float
+    batch_size: int
+
+
+@dataclass
+class SchedulerConfig:
+    max_concurrency: int
+    max_pending: int
 
 
 @dataclass
@@ -43,8 +128,16 @@ class LogConfig:
 @dataclass
 class Config:
     bot: BotConfig
+    webhook: WebhookConfig
     db: DatabaseConfig
     redis: RedisConfig
+    fsm: FSMConfig
+    cache: CacheConfig
+    activity: ActivityConfig
+    throttling: ThrottlingConfig
+    outbound: OutboundConfig
+    broadcast: BroadcastConfig
+    scheduler: SchedulerConfig
     log: LogConfig
 
 
@@ -68,20 +161,175 @@ def load_config(path: str | None = None) -> Config:
     except ValueError as e:
         raise ValueError(f"ADMIN_IDS must be integers, got: {raw_ids}") from e
 
+    webhook = WebhookConfig(
+        enabled=env.bool("WEBHOOK_ENABLED", default=False),
+        url=env.str("WEBHOOK_URL", default=""),
+        path=env.str("WEBHOOK_PATH", default="/webhook"),
+        secret=env.str("WEBHOOK_SECRET", default=""),
+        host=env.str("WEBHOOK_HOST", default="127.0.0.1"),
+        port=env.int("WEBHOOK_PORT", default=8080),
+        workers=env.int("WEBHOOK_WORKERS", default=1),
+        max_connections=env.int("WEBHOOK_MAX_CONNECTIONS", default=40)
+    )
+    if webhook.enabled and not webhook.url:
+        raise ValueError("WEBHOOK_URL must not be empty when WEBHOOK_ENABLED is set")
+    if webhook.workers < 1:
+        raise ValueError("WEBHOOK_WORKERS must be positive")
+
+    raw_threshold = env.str("POSTGRES_PREPARE_THRESHOLD", default="0")
+    try:
+        prepare_threshold = (
+            None if raw_threshold.lower() == "none" else int(raw_threshold)
+        )
+    except ValueError as e:
+        raise ValueError(
+            f"POSTGRES_PREPARE_THRESHOLD must be an integer or `none`, "
+            f"got: {raw_threshold}"
+        ) from e
+
     db = DatabaseConfig(
         name=env.str("POSTGRES_DB"),
         host=env.str("POSTGRES_HOST"),
         port=env.int("POSTGRES_PORT"),
         user=env.str("POSTGRES_USER"),
-        password=env.str("POSTGRES_PASSWORD")
+        password=env.str("POSTGRES_PASSWORD"),
+        pool_min_size=env.int("POSTGRES_POOL_MIN_SIZE", default=1),
+        pool_max_size=env.int("POSTGRES_POOL_MAX_SIZE", default=3),
+        pool_timeout=env.float("POSTGRES_POOL_TIMEOUT", default=10.0),
+        pool_max_waiting=env.int("POSTGRES_POOL_MAX_WAITING", default=0),
+        pool_max_lifetime=env.float("POSTGRES_POOL_MAX_LIFETIME", default=3600.0),
+        pool_max_idle=env.float("POSTGRES_POOL_MAX_IDLE", default=600.0),
+        pool_reconnect_timeout=env.float(
+            "POSTGRES_POOL_RECONNECT_TIMEOUT", default=300.0
+        ),
+        pool_stats_interval=env.float("POSTGRES_POOL_STATS_INTERVAL", default=60.0),
+        pool_adaptive=env.bool("POSTGRES_POOL_ADAPTIVE", default=False),
+        pool_adaptive_max_size=env.int("POSTGRES_POOL_ADAPTIVE_MAX_SIZE", default=10),
+        prepare_threshold=prepare_threshold,
+        replica_host=env.str("POSTGRES_REPLICA_HOST", default="") or None,
+        replica_port=env.int("POSTGRES_REPLICA_PORT", default=None),
+        replica_max_lag=env.float("POSTGRES_REPLICA_MAX_LAG", default=1.0),
+        replica_check_interval=env.float(
+            "POSTGRES_REPLICA_CHECK_INTERVAL", default=5.0
+        )
     )
 
+    if not 0 < db.pool_min_size <= db.pool_max_size:
+        raise ValueError(
+            "POSTGRES_POOL_MIN_SIZE must be positive and not greater than "
+            "POSTGRES_POOL_MAX_SIZE"
+        )
+
     redis = RedisConfig(
         host=env.str("REDIS_HOST"),
         port=env.int("REDIS_PORT"),
         db=env.int("REDIS_DATABASE"),
         password=env.str("REDIS_PASSWORD", default=""),
-        username=env.str("REDIS_USERNAME", default="")
+        username=env.str("REDIS_USERNAME", default=""),
+        max_connections=env.int("REDIS_MAX_CONNECTIONS", default=50),
+        pool_timeout=env.float("REDIS_POOL_TIMEOUT", default=5.0)
+    )
+
+    fsm_serializer = env.str("FSM_SERIALIZER", default="msgpack")
+    if fsm_serializer not in ("json", "msgpack"):
+        raise ValueError(
+            f"FSM_SERIALIZER must be `json` or `msgpack`, got: {fsm_serializer}"
+        )
+    if fsm_serializer == "msgpack" and importlib.util.find_spec("msgpack") is None:
+        raise ValueError(
+            "FSM_SERIALIZER is `msgpack`, but the `msgpack` package is not installed, "
+            "run `pip install -r requirements.txt` or set FSM_SERIALIZER=json"
+        )
+
+    fsm = FSMConfig(
+        serializer=fsm_serializer,
+        key_prefix=env.str("FSM_KEY_PREFIX", default="fsm"),
+        state_ttl=env.int("FSM_STATE_TTL", default=86400) or None,
+        data_ttl=env.int("FSM_DATA_TTL", default=86400) or None,
+        memory_tier=env.bool("FSM_MEMORY_TIER", default=False),
+        memory_max_size=env.int("FSM_MEMORY_MAX_SIZE", default=10_000),
+        memory_flush_interval=env.float("FSM_MEMORY_FLUSH_INTERVAL", default=1.0)
+    )
+    if fsm.memory_tier and webhook.enabled and webhook.workers > 1:
+        raise ValueError("FSM_MEMORY_TIER cannot be used with several WEBHOOK_WORKERS")
+
+    cache = CacheConfig(
+        profile_max_size=env.int("PROFILE_CACHE_MAX_SIZE", default=10_000),
+        profile_ttl=env.float("PROFILE_CACHE_TTL", default=300.0),
+        profile_redis_ttl=env.int("PROFILE_CACHE_REDIS_TTL", default=3600)
+    )
+
+    activity_backend = env.str("ACTIVITY_BACKEND", default="buffer")
+    if activity_backend not in ("buffer", "redis"):
+        raise ValueError(
+            f"ACTIVITY_BACKEND must be `buffer` or `redis`, got: {activity_backend}"
+        )
+
+    activity = ActivityConfig(
+        backend=activity_backend,
+        flush_interval=env.float("ACTIVITY_FLUSH_INTERVAL", default=5.0),
+        max_pending=env.int("ACTIVITY_MAX_PENDING", default=1000),
+        leaderboard=env.bool("LEADERBOARD_ENABLED", default=False),
+        leaderboard_reconcile_interval=env.float(
+            "LEADERBOARD_RECONCILE_INTERVAL", default=3600.0
+        )
+    )
+    # Activity kept in memory by the other workers is missed by the rebuild
+    if (
+        activity.leaderboard
+        and activity.backend == "buffer"
+        and webhook.enabled
+        and webhook.workers > 1
+    ):
+        raise ValueError(
+            "LEADERBOARD_ENABLED with several WEBHOOK_WORKERS requires "
+            "ACTIVITY_BACKEND=redis"
+        )
+
+    throttling_backend = env.str("THROTTLING_BACKEND", default="memory")
+    if throttling_backend not in ("memory", "redis"):
+        raise ValueError(
+            f"THROTTLING_BACKEND must be `memory` or `redis`, got: {throttling_backend}"
+        )
+
+    raw_rates = env.list(
+        "THROTTLING_RATES",
+        default=["message:1:5", "callback_query:2:10", "default:2:10"]
+    )
+    try:
+        rates = {}
+        for raw_rate in raw_rates:
+            update_type, rate, burst = raw_rate.strip().split(":")
+            rates[update_type] = (float(rate), int(burst))
+    except ValueError as e:
+        raise ValueError(
+            f"THROTTLING_RATES must be `update_type:rate:burst` items, got: {raw_rates}"
+        ) from e
+    if "default" not in rates:
+        raise ValueError("THROTTLING_RATES must contain the `default` item")
+
+    throttling = ThrottlingConfig(
+        enabled=env.bool("THROTTLING_ENABLED", default=True),
+        backend=throttling_backend,
+        rates=rates,
+        warn=env.bool("THROTTLING_WARN", default=True)
+    )
+
+    outbound = OutboundConfig(
+        global_rate=env.float("OUTBOUND_GLOBAL_RATE", default=30.0),
+        per_chat_rate=env.float("OUTBOUND_PER_CHAT_RATE", default=1.0),
+        max_retries=env.int("OUTBOUND_MAX_RETRIES", default=3)
+    )
+
+    broadcast = BroadcastConfig(
+        workers=env.int("BROADCAST_WORKERS", default=10),
+        rate=env.float("BROADCAST_RATE", default=20.0),
+        batch_size=env.int("BROADCAST_BATCH_SIZE", default=500)
+    )
+
+    scheduler = SchedulerConfig(
+        max_concurrency=env.int("UPDATES_MAX_CONCURRENCY", default=100),
+        max_pending=env.int("UPDATES_MAX_PENDING", default=1000)
     )
 
     log_settings = LogConfig(
@@ -94,7 +342,15 @@ def load_config(path: str | None = None) -> Config:
 
     return Config(
         bot=BotConfig(token=token, admin_ids=admin_ids),
+        webhook=webhook,
         db=db,
         redis=redis,
+        fsm=fsm,
+        cache=cache,
+        activity=activity,
+        throttling=throttling,
+        outbound=outbound,
+        broadcast=broadcast,
+        scheduler=scheduler,
         log=log_settings
     )
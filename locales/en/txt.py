@@ -19,8 +19,12 @@ EN: dict[str, str] = {
                    "/help - view this help\n"
                    "/ban - ban the user\n"
                    "/unban - unban the user\n"
+                   "/massban - ban users from an attached list\n"
+                   "/massunban - unban users from an attached list\n"
+                   "/broadcast - send the replied message to all users\n"
                    "/statistics - view user activity statistics",
     "/lang": "Select a language",
+    "throttled": "⏳ Too many requests, please slow down.",
     "no_echo": "This type of update is not supported by the send_copy method.",
     "ru": "🇷🇺 Russian",
     "en": "🇬🇧 English",
@@ -36,6 +40,9 @@ EN: dict[str, str] = {
     "/help_description": "View the help for the bot",
     "/ban_description": "Ban a user (requires user_id or username)",
     "/unban_description": "Unban the user (requires user_id or username)",
+    "/massban_description": "Ban users from an attached file of IDs and usernames",
+    "/massunban_description": "Unban users from an attached file of IDs and usernames",
+    "/broadcast_description": "Send the replied message to all users",
     "/statistics_description": "View user activity statistics",
     "empty_ban_answer": "❗ Please specify the user's ID or @username.",
     "incorrect_ban_arg": "⚠️ <b>Incorrect format.</b>\n\nUse /ban <code>ID</code> "
@@ -48,5 +55,28 @@ EN: dict[str, str] = {
                            "or /unban <code>@username</code>",
     "not_banned": "❗ The user was not banned anyway!",
     "successfully_unbanned": "⚠️ The user has been successfully unbanned!",
+    "empty_mass_ban_answer": "❗ Please attach a .txt or .csv file with user IDs "
+                             "or @usernames separated by new lines, commas or spaces, "
+                             "and put the command in the file caption.",
+    "too_large_mass_ban_file": "❗ The file is too large, the limit is 20 MB.",
+    "mass_ban_result": "⚠️ <b>Mass ban completed.</b>\n\nListed: {}\n"
+                       "Found in the database: {}\nBanned now: {}\n"
+                       "Invalid entries skipped: {}",
+    "mass_unban_result": "⚠️ <b>Mass unban completed.</b>\n\nListed: {}\n"
+                         "Found in the database: {}\nUnbanned now: {}\n"
+                         "Invalid entries skipped: {}",
+    "broadcast_started": "📣 The broadcast has started. I will report when it is finished.\n\n"
+                         "Send /broadcast to see the progress or "
+                         "/broadcast <code>cancel</code> to stop it.",
+    "broadcast_in_progress": "❗ Another broadcast is in progress. "
+                             "Send /broadcast <code>cancel</code> to stop it.",
+    "no_broadcast": "❗ There is no broadcast in progress.\n\n"
+                    "Reply /broadcast to a message to send it to all users.",
+    "broadcast_status": "📣 <b>Broadcast in progress.</b>\n\nSent: {}\n"
+                        "Blocked the bot: {}\nFailed: {}",
+    "broadcast_cancelled": "⚠️ <b>Broadcast cancelled.</b>\n\nSent: {}\n"
+                           "Blocked the bot: {}\nFailed: {}",
+    "broadcast_finished": "✅ <b>Broadcast finished.</b>\n\nSent: {}\n"
+                          "Blocked the bot: {}\nFailed: {}",
     "statistics": "📊 <b>Statistics on user actions:</b>\n\n{}",
 }
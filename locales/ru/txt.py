@@ -19,8 +19,12 @@ RU: dict[str, str] = {
                    "/help - посмотреть эту справку\n"
                    "/ban - забанить пользователя\n"
                    "/unban - разбанить пользователя\n"
+                   "/massban - забанить пользователей из приложенного списка\n"
+                   "/massunban - разбанить пользователей из приложенного списка\n"
+                   "/broadcast - отправить сообщение, на которое дан ответ, всем пользователям\n"
                    "/statistics - посмотреть статистику активности пользователей",
     "/lang": "Выберите язык",
+    "throttled": "⏳ Слишком много запросов, пожалуйста, помедленнее.",
     "no_echo": "Данный тип апдейтов не поддерживается методом send_copy",
     "ru": "🇷🇺 Русский",
     "en": "🇬🇧 Английский",
@@ -36,6 +40,9 @@ RU: dict[str, str] = {
     "/help_description": "Посмотреть справку по работе бота",
     "/ban_description": "Забанить пользователя (требует user_id или username)",
     "/unban_description": "Разбанить пользователя (требует user_id или username)",
+    "/massban_description": "Забанить пользователей из файла с ID и username",
+    "/massunban_description": "Разбанить пользователей из файла с ID и username",
+    "/broadcast_description": "Отправить сообщение, на которое дан ответ, всем пользователям",
     "/statistics_description": "Посмотреть статистику активности пользователей",
     "empty_ban_answer": "❗ Пожалуйста, укажите ID пользователя или @username.",
     "incorrect_ban_arg": "⚠️ <b>Неверный формат.</b>\n\nИспользуйте: /ban <code>ID</code> "
@@ -48,5 +55,29 @@ RU: dict[str, str] = {
                            "или /unban <code>@username</code>",
     "not_banned": "❗ Пользователь и так не был забанен!",
     "successfully_unbanned": "⚠️ Пользователь успешно разбанен!",
+    "empty_mass_ban_answer": "❗ Пожалуйста, приложите .txt или .csv файл с ID пользователей "
+                             "или @username, разделенными переносами строк, запятыми или "
+                             "пробелами, и укажите команду в подписи к файлу.",
+    "too_large_mass_ban_file": "❗ Файл слишком большой, ограничение - 20 МБ.",
+    "mass_ban_result": "⚠️ <b>Массовый бан завершен.</b>\n\nВ списке: {}\n"
+                       "Найдено в базе данных: {}\nЗабанено сейчас: {}\n"
+                       "Пропущено некорректных записей: {}",
+    "mass_unban_result": "⚠️ <b>Массовый разбан завершен.</b>\n\nВ списке: {}\n"
+                         "Найдено в базе данных: {}\nРазбанено сейчас: {}\n"
+                         "Пропущено некорректных записей: {}",
+    "broadcast_started": "📣 Рассылка началась. Я сообщу, когда она завершится.\n\n"
+                         "Отправьте /broadcast, чтобы посмотреть прогресс, или "
+                         "/broadcast <code>cancel</code>, чтобы остановить ее.",
+    "broadcast_in_progress": "❗ Уже идет другая рассылка. "
+                             "Отправьте /broadcast <code>cancel</code>, чтобы остановить ее.",
+    "no_broadcast": "❗ Сейчас рассылка не идет.\n\n"
+                    "Ответьте командой /broadcast на сообщение, чтобы отправить его всем "
+                    "пользователям.",
+    "broadcast_status": "📣 <b>Идет рассылка.</b>\n\nОтправлено: {}\n"
+                        "Заблокировали бота: {}\nОшибок: {}",
+    "broadcast_cancelled": "⚠️ <b>Рассылка отменена.</b>\n\nОтправлено: {}\n"
+                           "Заблокировали бота: {}\nОшибок: {}",
+    "broadcast_finished": "✅ <b>Рассылка завершена.</b>\n\nОтправлено: {}\n"
+                          "Заблокировали бота: {}\nОшибок: {}",
     "statistics": "📊 <b>Статистика по действиям пользователей:</b>\n\n{}"
 }
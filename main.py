@@ -4,6 +4,7 @@ import os
 import sys
 
 from app.bot import main
+from app.bot.webhook import run_workers
 from config.config import Config, load_config
 
 config: Config = load_config()
@@ -17,4 +18,7 @@ logging.basicConfig(
 if sys.platform.startswith("win") or os.name == "nt":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-asyncio.run(main(config))
+if config.webhook.enabled:
+    run_workers(config, main)
+else:
+    asyncio.run(main(config))
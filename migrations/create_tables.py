@@ -49,6 +49,8 @@ async def main():
                                   is_alive   BOOLEAN     NOT NULL,
                                   banned     BOOLEAN     NOT NULL
                               );
+                              CREATE INDEX IF NOT EXISTS idx_users_username
+                                  ON users (username);
                               """
                     )
                     await cursor.execute(
@@ -65,7 +67,36 @@ async def main():
                                   ON activity (user_id, activity_date);
                               """
                     )
-                logger.info("Tables `users` and `activity` were successfully created")
+                    await cursor.execute(
+                        query="""
+                              CREATE TABLE IF NOT EXISTS activity_totals
+                              (
+                                  user_id       BIGINT PRIMARY KEY REFERENCES users (user_id),
+                                  total_actions BIGINT NOT NULL DEFAULT 0
+                              );
+                              CREATE INDEX IF NOT EXISTS idx_activity_totals_actions
+                                  ON activity_totals (total_actions DESC);
+                              INSERT INTO activity_totals (user_id, total_actions)
+                              SELECT user_id, SUM(actions)
+                              FROM activity
+                              WHERE user_id IS NOT NULL
+                              GROUP BY user_id
+                              ON CONFLICT (user_id) DO NOTHING;
+                              """
+                    )
+                    await cursor.execute(
+                        query="""
+                              CREATE TABLE IF NOT EXISTS activity_drains
+                              (
+                                  drain_id   VARCHAR(64) PRIMARY KEY,
+                                  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                              );
+                              """
+                    )
+                logger.info(
+                    "Tables `users`, `activity`, `activity_totals` and "
+                    "`activity_drains` were successfully created"
+                )
     except Error as db_error:
         logger.exception("Database-specific error: %s", db_error)
     except Exception as e: